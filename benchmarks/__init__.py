@@ -0,0 +1,11 @@
+"""Micro-benchmarks, run from the project root, eg.:
+
+    python -m benchmarks.status_distance
+"""
+import os
+
+
+def setup_django(settings_module='restaurant_choices.settings'):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
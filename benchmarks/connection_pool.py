@@ -0,0 +1,119 @@
+"""Load test of the list endpoint through the whole middleware stack with
+concurrent client threads, comparing fresh connections per request,
+persistent connections and the in-process pool (utils.db_pool) on a
+SQLite file database seeded on the first run:
+
+    python -m benchmarks.connection_pool --conn-max-age 0
+    python -m benchmarks.connection_pool --conn-max-age 60
+    python -m benchmarks.connection_pool --pool --pool-size 4
+"""
+# python
+from __future__ import print_function
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from . import setup_django
+from .restaurant_list import (USER, percentile, seed_countries,
+                              seed_restaurants, seed_users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default=os.path.join(
+        tempfile.gettempdir(), 'restaurant_choices_bench.sqlite3'))
+    parser.add_argument('--restaurants', type=int, default=10000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100,
+                        help='requests per thread')
+    parser.add_argument('--conn-max-age', type=int, default=0)
+    parser.add_argument('--pool', action='store_true')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--output', help='json results file')
+    args = parser.parse_args()
+
+    os.environ['SQLITE_NAME'] = args.database
+    os.environ['DB_CONN_MAX_AGE'] = str(args.conn_max_age)
+    os.environ['DB_POOL_SIZE'] = str(args.pool_size)
+    if args.pool:
+        os.environ['DB_POOL'] = 'on'
+    setup_django('restaurant_choices.settings_sqlite')
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from services.models import Restaurant
+    from services.views.restaurant import RestaurantCollection
+    from utils.db_pool import pool_stats
+
+    # no debug cursor or debug toolbar
+    settings.DEBUG = False
+    call_command('migrate', verbosity=0)
+    if not Restaurant.objects.exists():
+        rnd = random.Random(0)
+        seed_countries(50, rnd)
+        seed_restaurants(0, args.restaurants, 50, rnd)
+    users = [pk for _, pk in seed_users([0, 10, 200], args.restaurants,
+                                        random.Random(1))]
+    connection.close()
+    # measure the endpoint, not the throttle
+    RestaurantCollection.throttle_classes = ()
+
+    # with the pool these are checkouts, pool.opened counts the connections
+    opened = [0]
+    connection_created.connect(
+        lambda sender, **kwargs: opened.__setitem__(0, opened[0] + 1),
+        weak=False)
+    latencies, errors = list(), list()
+    lock = threading.Lock()
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        client = Client(HTTP_HOST='localhost')
+        times = list()
+        for _ in range(args.requests):
+            params = dict(USER, userId=rnd.choice(users),
+                          page=rnd.randrange(5), limit=20)
+            if rnd.random() < 0.3:
+                params['radius'] = 25
+            start = time.perf_counter()
+            response = client.get('/services/v1/restaurant/', params)
+            times.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                with lock:
+                    errors.append(response.status_code)
+        with lock:
+            latencies.extend(times)
+
+    threads = [threading.Thread(target=worker, args=(seed,))
+               for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {'mode': 'pool' if args.pool else
+              'conn_max_age=%d' % args.conn_max_age,
+              'threads': args.threads,
+              'requests': len(latencies),
+              'errors': len(errors),
+              'requestsPerSecond': round(len(latencies) / elapsed, 1),
+              'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+              'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+              'connectionsOpened': opened[0],
+              'pool': pool_stats()}
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Measures RestaurantListController search/exclude parsing over realistic
+list endpoint query strings, with a cold and a warm parsed query cache.
+
+    python -m benchmarks.controller_search [--number 20000]
+"""
+# python
+from __future__ import print_function
+import argparse
+import timeit
+from unittest import mock
+
+from . import setup_django
+
+
+QUERY_STRINGS = [
+    'userId=1&latitude=57.149453&longitude=-2.172841',
+    'userId=7&latitude=57.149453&longitude=-2.172841&city=Aberdeen',
+    'userId=3&latitude=51.507351&longitude=-0.127758&city=London'
+    '&restaurantName__istartswith=Aug&limit=20&page=2',
+    'userId=9&latitude=53.480759&longitude=-2.242631'
+    '&city__in=[Manchester,Salford]&postcode__iendswith=1XZ&order=-city',
+    'userId=4&latitude=55.953252&longitude=-3.188267'
+    '&idRestaurant__range=(100,200)&exclude__city__in=Leith'
+    '&restaurantName__icontains=thai&postcode__isnull=false',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.http import QueryDict
+    from services.controllers.restaurant import RestaurantListController
+    from utils.controllers import parse_search
+
+    request = mock.Mock()
+    queries = [QueryDict(qs) for qs in QUERY_STRINGS]
+
+    def parse():
+        for data in queries:
+            controller = RestaurantListController(data=data, request=request)
+            controller.validate_search()
+            controller.validate_exclude()
+
+    def cold():
+        parse_search.cache_clear()
+        parse()
+
+    per_query = args.number * len(queries)
+    for name, func in (('cold cache', cold), ('warm cache', parse)):
+        parse()
+        elapsed = min(timeit.repeat(func, number=args.number, repeat=3))
+        print('%-12s %8.2f us/query' % (name, elapsed / per_query * 1e6))
+    print(parse_search.cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""Latency, queries per request and peak memory of the restaurant list
+endpoint (RestaurantCollection.get) over growing catalogues, users with
+different favorite/blocklist sizes and the search filters of
+RestaurantListController. Runs on the SQLite settings override, results
+are written as json to compare commits (set SQLITE_NAME to a file when
+CONCURRENT_QUERIES is on, every connection gets its own ':memory:'):
+
+    python -m benchmarks.restaurant_list [--sizes 1000 10000 100000]
+        [--output results.json] [--compare previous.json]
+"""
+# python
+from __future__ import print_function
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import time as daytime
+from decimal import Decimal
+
+from . import setup_django
+
+
+CITIES = ['Aberdeen', 'Edinburgh', 'Glasgow', 'London', 'Leeds', 'York',
+          'Manchester', 'Liverpool', 'Bristol', 'Cardiff', 'Belfast',
+          'Oxford', 'Cambridge', 'Norwich', 'Brighton', 'Newcastle']
+WORDS = ['Thai', 'Curry', 'Pizza', 'Grill', 'Noodle', 'Burger', 'Sushi',
+         'Tapas', 'Kitchen', 'House', 'Garden', 'Palace', 'Corner', 'Bistro']
+USER = {'latitude': '57.149453', 'longitude': '-2.172841'}
+
+# name, query parameters, the search ones come from
+# RestaurantListController.Meta.search_fields
+SCENARIOS = [
+    ('all', {}),
+    ('page', {'page': 3, 'limit': 20, 'order': '-city'}),
+    ('cursor', {'cursor': '', 'limit': 20}),
+    ('city', {'city': 'Aberdeen'}),
+    ('city__in', {'city__in': '[Leeds,York]', 'order': 'postcode'}),
+    ('name__istartswith', {'restaurantName__istartswith': 'Thai'}),
+    ('name__icontains', {'restaurantName__icontains': 'grill'}),
+    ('name__iendswith', {'restaurantName__iendswith': '7'}),
+    ('city__icontains', {'city__icontains': 'chest'}),
+    ('postcode__iendswith', {'postcode__iendswith': '1XZ'}),
+    ('postcode__isnull', {'postcode__isnull': 'false', 'limit': 10}),
+    ('idRestaurant__range', {'idRestaurant__range': '(100,5000)'}),
+    ('exclude', {'exclude__city__in': '[London,Leeds]'}),
+    ('radius', {'radius': 25}),
+    ('radius_city', {'radius': 100, 'order': 'city'}),
+    ('distance', {'order': 'distance', 'limit': 20}),
+    ('q', {'q': 'thai gril', 'limit': 20}),
+    ('q_typeahead', {'q': 'Nood', 'limit': 10}),
+    ('q_cursor', {'q': 'sushi bristol', 'cursor': '', 'limit': 20}),
+    ('open_at', {'open_at': '23:30'}),
+    ('open_at_radius', {'open_at': '12:00', 'radius': 25}),
+]
+
+
+def seed_countries(count, rnd):
+    from services.models import Country
+
+    Country.objects.bulk_create([
+        Country(idCountry=pk, a2Code='%c%c' % (65 + pk // 26 % 26,
+                                               65 + pk % 26),
+                a3Code='C%02d' % pk, countryName='Country %d' % pk,
+                phonePrefix=pk)
+        for pk in range(1, count + 1)])
+
+
+def seed_restaurants(start, stop, countries, rnd, batch=5000):
+    from services.hours import sync_opening_hours
+    from services.listing import sync_listing
+    from services.models import Restaurant
+    from services.search import search_values, sync_search_index
+
+    for first in range(start, stop, batch):
+        restaurants = [
+            Restaurant(
+                idRestaurant=pk, country_id=rnd.randint(1, countries),
+                restaurantName='%s %s %d' % (rnd.choice(WORDS),
+                                             rnd.choice(WORDS), pk),
+                address1='%d High Street' % rnd.randint(1, 500),
+                city=rnd.choice(CITIES),
+                postcode=rnd.choice([None, 'AB%d %dXZ' % (
+                    rnd.randint(1, 99), rnd.randint(1, 9))]),
+                phones={'mobile': '07%09d' % pk},
+                openingTime=daytime(rnd.randrange(6, 12)),
+                closingTime=daytime(rnd.randrange(24)),
+                latitude=Decimal('%.6f' % rnd.uniform(49.9, 58.6)),
+                longitude=Decimal('%.6f' % rnd.uniform(-7.5, 1.7)))
+            for pk in range(first + 1, min(first + batch, stop) + 1)]
+        # bulk_create sends no pre_save/post_save, see services.signals
+        for r in restaurants:
+            for name, value in search_values(r.restaurantName,
+                                             r.city).items():
+                setattr(r, name, value)
+        Restaurant.objects.bulk_create(restaurants)
+        sync_opening_hours((r.pk, r.openingTime, r.closingTime)
+                           for r in restaurants)
+        sync_search_index((r.pk, r.restaurantName, r.city)
+                          for r in restaurants)
+        sync_listing(r.pk for r in restaurants)
+
+
+def seed_users(list_sizes, restaurants, rnd):
+    """One user per list size, with that many favorites and blocked
+    restaurants. Returns the user ids.
+    """
+    from django.contrib.auth.models import User
+    from services.models import (UserBlocklistRestaurant,
+                                 UserFavoriteRestaurant)
+
+    users = list()
+    for size in list_sizes:
+        user, _ = User.objects.get_or_create(username='bench-%d' % size)
+        for model in (UserFavoriteRestaurant, UserBlocklistRestaurant):
+            model.objects.filter(user=user).delete()
+            model.objects.bulk_create([
+                model(user=user, restaurant_id=pk) for pk in
+                rnd.sample(range(1, restaurants + 1),
+                           min(size, restaurants))])
+        users.append((size, user.pk))
+    return users
+
+
+class QueryCounter(object):
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[int(round((len(values) - 1) * fraction))]
+
+
+def run_scenario(view, factory, params, requests):
+    from django.db import connection
+
+    latencies, counter = list(), QueryCounter()
+    with connection.execute_wrapper(counter):
+        for _ in range(requests):
+            request = factory.get('/services/v1/restaurant/', params)
+            start = time.perf_counter()
+            response = view(request).render()
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.data
+    # a separate request for the memory, tracemalloc slows everything down
+    tracemalloc.start()
+    view(factory.get('/services/v1/restaurant/', params))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'queries': counter.count / float(requests),
+            'peak_kb': round(peak / 1024.0, 1)}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result['restaurants'], result['listSize'], result['scenario'])
+
+
+def compare(results, path):
+    with open(path) as f:
+        previous = dict((result_key(r), r) for r in json.load(f)['results'])
+    print('\ncompared to %s' % path)
+    print('%10s %6s %-22s %10s %10s' % ('rows', 'lists', 'scenario',
+                                        'p50', 'p99'))
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        print('%10d %6d %-22s %9.2fx %9.2fx' % (
+            result_key(result) + (result['p50_ms'] / old['p50_ms'],
+                                  result['p99_ms'] / old['p99_ms'])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help='catalogue sizes, up to 1000000')
+    parser.add_argument('--countries', type=int, default=50)
+    parser.add_argument('--list-sizes', type=int, nargs='+',
+                        default=[0, 10, 200],
+                        help='favorites and blocked restaurants per user')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='requests per scenario')
+    parser.add_argument('--scenarios', nargs='+',
+                        choices=[name for name, _ in SCENARIOS])
+    parser.add_argument('--output', default='restaurant_list.json')
+    parser.add_argument('--compare', help='results of a previous run')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SQLITE_NAME', ':memory:')
+    setup_django('restaurant_choices.settings_sqlite')
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import RequestFactory
+    from services.views.restaurant import RestaurantCollection
+
+    # no debug cursor or debug toolbar
+    settings.DEBUG = False
+    call_command('migrate', verbosity=0)
+    # measure the endpoint, not the throttle
+    RestaurantCollection.throttle_classes = ()
+    view = RestaurantCollection.as_view()
+    factory = RequestFactory(SERVER_NAME='localhost')
+    scenarios = [(name, params) for name, params in SCENARIOS
+                 if not args.scenarios or name in args.scenarios]
+
+    rnd = random.Random(args.seed)
+    seed_countries(args.countries, rnd)
+    results, seeded = list(), 0
+    print('%10s %6s %-22s %9s %9s %8s %10s' % (
+        'rows', 'lists', 'scenario', 'p50 ms', 'p99 ms', 'queries',
+        'peak KiB'))
+    for size in sorted(args.sizes):
+        seed_restaurants(seeded, size, args.countries, rnd)
+        seeded = size
+        for list_size, user_id in seed_users(args.list_sizes, size, rnd):
+            for name, params in scenarios:
+                params = dict(params, userId=user_id, **USER)
+                result = dict(restaurants=size, listSize=list_size,
+                              scenario=name, params=params)
+                result.update(run_scenario(view, factory, params,
+                                           args.requests))
+                results.append(result)
+                print('%10d %6d %-22s %9.2f %9.2f %8.1f %10.1f' % (
+                    size, list_size, name, result['p50_ms'],
+                    result['p99_ms'], result['queries'], result['peak_kb']))
+
+    with open(args.output, 'w') as f:
+        json.dump({'commit': git_commit(),
+                   'python': platform.python_version(),
+                   'countries': args.countries,
+                   'requests': args.requests,
+                   'settings': dict((name, getattr(settings, name, None))
+                                    for name in (
+                                        'RESTAURANT_SPATIAL_INDEX',
+                                        'RESTAURANT_FAST_SERIALIZER',
+                                        'RESTAURANT_RESPONSE_CACHE',
+                                        'RESTAURANT_LISTING',
+                                        'CONCURRENT_QUERIES')),
+                   'results': results}, f, indent=2)
+    print('\nresults written to %s' % args.output)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
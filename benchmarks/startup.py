@@ -0,0 +1,142 @@
+"""Worker startup of the settings profiles: time to import the WSGI
+application, resident memory and modules loaded afterwards, and the
+latency of the first and second requests through the whole middleware
+stack. Each profile runs in a fresh interpreter, --runs times:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --profiles restaurant_choices.settings \
+        restaurant_choices.settings_production --runs 10
+
+--sqlite (the default when mysqlclient isn't installed) points the
+profiles at an in-memory SQLite database, the endpoint requested doesn't
+query it. --block makes modules unimportable, eg. the production install
+without coreapi and coreschema (rest_framework.compat imports them when
+installed):
+
+    python -m benchmarks.startup --block coreapi coreschema \
+        --profiles restaurant_choices.settings_production
+"""
+# python
+from __future__ import print_function
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from .restaurant_list import percentile
+
+PROFILES = ['restaurant_choices.settings',
+            'restaurant_choices.settings_production']
+# staff only, the anonymous 403 still goes through the authentication,
+# permission and rendering of REST framework without a database query
+PATH = '/services/v1/database/pool/'
+STATUS = '403'
+
+# run in the child interpreter, prints a json line
+CHILD = '''
+import json, sys, time
+for name in %(block)r:
+    sys.modules[name] = None
+start = time.perf_counter()
+if %(sqlite)r:
+    from django.conf import settings
+    settings.DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3',
+                                      'NAME': ':memory:'}}
+    settings.DATABASE_REPLICAS = []
+from restaurant_choices.wsgi import application
+startup = time.perf_counter() - start
+
+
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024.0
+
+
+def request():
+    from wsgiref.util import setup_testing_defaults
+    environ = {'PATH_INFO': %(path)r, 'REQUEST_METHOD': 'GET',
+               'HTTP_HOST': 'localhost'}
+    setup_testing_defaults(environ)
+    status = []
+    start = time.perf_counter()
+    body = b''.join(application(environ,
+                                lambda s, headers: status.append(s)))
+    assert status[0].startswith(%(status)r), (status, body[:200])
+    return time.perf_counter() - start
+
+
+result = {'startup': startup, 'rss_mb': rss(),
+          'modules': len(sys.modules),
+          'coreapi': 'coreapi' in sys.modules}
+result['first_request'] = request()
+result['second_request'] = request()
+result['rss_after_request_mb'] = rss()
+result['modules_after_request'] = len(sys.modules)
+print(json.dumps(result))
+'''
+
+
+def has_mysqlclient():
+    try:
+        import MySQLdb  # noqa F401
+    except ImportError:
+        return False
+    return True
+
+
+def run(profile, sqlite, block):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile,
+               PYTHONWARNINGS='ignore')
+    # the production profile requires one
+    env.setdefault('SECRET_KEY', 'benchmark')
+    output = subprocess.check_output(
+        [sys.executable, '-c',
+         CHILD % {'sqlite': sqlite, 'path': PATH, 'status': STATUS,
+                 'block': block}],
+        env=env, cwd=os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profiles', nargs='+', default=PROFILES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--sqlite', action='store_true',
+                        default=not has_mysqlclient())
+    parser.add_argument('--block', nargs='*', default=[])
+    parser.add_argument('--output', help='json results file')
+    args = parser.parse_args()
+
+    results = list()
+    print('%-40s %10s %8s %8s %10s %10s %8s %8s' % (
+        'profile', 'startup ms', 'rss MB', 'modules', '1st req ms',
+        '2nd req ms', 'rss MB', 'modules'))
+    for profile in args.profiles:
+        runs = [run(profile, args.sqlite, args.block)
+                for _ in range(args.runs)]
+        result = {'profile': profile, 'runs': args.runs,
+                  'modules': runs[0]['modules'],
+                  'modules_after_request': runs[0]['modules_after_request'],
+                  'coreapi': runs[0]['coreapi']}
+        for key in ('startup', 'first_request', 'second_request'):
+            result['%s_ms' % key] = round(percentile(
+                [r[key] for r in runs], 0.5) * 1000, 1)
+        for key in ('rss_mb', 'rss_after_request_mb'):
+            result[key] = round(percentile([r[key] for r in runs], 0.5), 1)
+        results.append(result)
+        print('%-40s %10.1f %8.1f %8d %10.1f %10.1f %8.1f %8d' % (
+            profile, result['startup_ms'], result['rss_mb'],
+            result['modules'], result['first_request_ms'],
+            result['second_request_ms'], result['rss_after_request_mb'],
+            result['modules_after_request']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compares the per-row status_distance helper against the vectorized
+batch_status_distance at 1k/10k/100k restaurants, no database is needed.
+
+    python -m benchmarks.status_distance [--repeat 5]
+"""
+# python
+from __future__ import print_function
+import argparse
+import random
+import timeit
+from datetime import time
+from decimal import Decimal
+
+from . import setup_django
+
+
+def restaurants(count, seed=0):
+    from services.models import Restaurant
+
+    rnd = random.Random(seed)
+    return [Restaurant(latitude=Decimal('%.6f' % rnd.uniform(49.9, 58.6)),
+                       longitude=Decimal('%.6f' % rnd.uniform(-7.5, 1.7)),
+                       openingTime=time(rnd.randrange(24), rnd.randrange(60)),
+                       closingTime=time(rnd.randrange(24), rnd.randrange(60)))
+            for _ in range(count)]
+
+
+class UserData(object):
+    GET = {'latitude': '57.149453', 'longitude': '-2.172841'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    setup_django()
+    from services.views.restaurant import (batch_status_distance,
+                                           status_distance)
+
+    latitude, longitude = (float(UserData.GET['latitude']),
+                           float(UserData.GET['longitude']))
+    print('%10s %14s %14s %8s' % ('rows', 'per row (ms)', 'batch (ms)',
+                                  'speedup'))
+    for size in args.sizes:
+        objs = restaurants(size)
+        per_row = min(timeit.repeat(
+            lambda: [status_distance(UserData, obj) for obj in objs],
+            number=1, repeat=args.repeat))
+        batch = min(timeit.repeat(
+            lambda: batch_status_distance(latitude, longitude, objs),
+            number=1, repeat=args.repeat))
+        print('%10d %14.2f %14.2f %7.1fx' % (size, per_row * 1000,
+                                             batch * 1000, per_row / batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Overhead per request of the DRF UserRateThrottle (timestamp history)
+and of utils.throttling.UserSlidingWindowThrottle (two counters), on the
+local memory cache and a file based cache standing in for a shared one:
+
+    python -m benchmarks.throttling [--rates 10/second 1000/minute]
+"""
+# python
+from __future__ import print_function
+import argparse
+import json
+import tempfile
+import time
+
+from . import setup_django
+from .restaurant_list import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rates', nargs='+',
+                        default=['10/second', '1000/minute'])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--output', help='json results file')
+    args = parser.parse_args()
+
+    setup_django('restaurant_choices.settings_sqlite')
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.test import RequestFactory
+    from rest_framework.throttling import UserRateThrottle
+    from utils.throttling import UserSlidingWindowThrottle
+
+    directory = tempfile.TemporaryDirectory()
+    settings.CACHES.update({
+        'bench_locmem': {'BACKEND': 'django.core.cache.backends.locmem.'
+                                    'LocMemCache',
+                         'LOCATION': 'bench'},
+        'bench_file': {'BACKEND': 'django.core.cache.backends.filebased.'
+                                  'FileBasedCache',
+                       'LOCATION': directory.name}})
+
+    class User(object):
+        is_authenticated = True
+
+        def __init__(self, pk):
+            self.pk = pk
+
+    requests = list()
+    for pk in range(args.users):
+        request = RequestFactory().get('/services/v1/restaurant/')
+        request.user = User(pk + 1)
+        requests.append(request)
+
+    results = list()
+    print('%-28s %-12s %-14s %9s %9s %9s' % (
+        'throttle', 'cache', 'rate', 'mean us', 'p99 us', 'accepted'))
+    for rate in args.rates:
+        for alias in ('bench_locmem', 'bench_file'):
+            for base in (UserRateThrottle, UserSlidingWindowThrottle):
+                cache = caches[alias]
+                cache.clear()
+                # DRF instantiates the throttles of every request
+                throttle_class = type(base.__name__, (base,), {
+                    'THROTTLE_RATES': {'user': rate},
+                    'cache': cache})
+                settings.THROTTLE_CACHE = alias
+                latencies, accepted = list(), 0
+                for i in range(args.requests):
+                    request = requests[i % len(requests)]
+                    start = time.perf_counter()
+                    accepted += throttle_class().allow_request(request, None)
+                    latencies.append(time.perf_counter() - start)
+                result = {'throttle': base.__name__, 'cache': alias[6:],
+                          'rate': rate,
+                          'mean_us': round(sum(latencies) / len(latencies)
+                                           * 1e6, 1),
+                          'p99_us': round(percentile(latencies, 0.99) * 1e6,
+                                          1),
+                          'accepted': accepted}
+                results.append(result)
+                print('%-28s %-12s %-14s %9.1f %9.1f %9d' % (
+                    result['throttle'], result['cache'], rate,
+                    result['mean_us'], result['p99_us'], accepted))
+    directory.cleanup()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
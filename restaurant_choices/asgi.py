@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from django.conf import settings
+
+from utils.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant_choices.settings')
 
 application = get_asgi_application()
+
+if getattr(settings, 'PREWARM', False):
+    from utils.startup import prewarm
+    prewarm()
@@ -47,8 +47,18 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "",
-    }
+    },
+    # request throttle counters (utils.throttling), replica sticky markers
+    # (utils.routers) and the catalogue version (services.cache), point it
+    # at a cache shared by the workers (memcached, a file based cache) for
+    # a global limit and for every worker to see the markers and versions
+    "throttle": {
+        "BACKEND": os.getenv("THROTTLE_CACHE_BACKEND",
+                             "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("THROTTLE_CACHE_LOCATION", "throttle"),
+    },
 }
+THROTTLE_CACHE = "throttle"
 
 
 # Application definition
@@ -68,6 +78,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.db_pool.ConnectionHealthMiddleware',
+    'utils.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,9 +117,17 @@ WSGI_APPLICATION = 'restaurant_choices.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# DB_POOL=on takes the connections from an in-process pool (utils.db_pool),
+# handed back after every request, otherwise connections persist for
+# DB_CONN_MAX_AGE seconds and are pinged after DB_HEALTH_CHECK_AFTER idle
+# seconds.
+DB_POOL = os.getenv('DB_POOL') == 'on'
+DB_HEALTH_CHECK_AFTER = int(os.getenv('DB_HEALTH_CHECK_AFTER') or 30)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': ('utils.db_backends.mysql' if DB_POOL
+                   else 'django.db.backends.mysql'),
         'NAME': 'restaurant_choices',
         'USER': 'root',
         'PASSWORD': os.getenv('PASSWORD') or 'root',
@@ -117,9 +137,48 @@ DATABASES = {
             # Tell MySQLdb to connect with 'utf8mb4' character set
             'charset': 'utf8mb4',
         },
+        'CONN_MAX_AGE': 0 if DB_POOL else int(
+            os.getenv('DB_CONN_MAX_AGE') or 60),
+        # connections per process, seconds before a connection is replaced,
+        # seconds idle before it is, seconds to wait for a free connection
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE') or 10),
+            'RECYCLE': int(os.getenv('DB_POOL_RECYCLE') or 3600),
+            'IDLE_TIMEOUT': int(os.getenv('DB_POOL_IDLE_TIMEOUT') or 300),
+            'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT') or 10),
+        },
     }
 }
 
+# Read replicas of default, one alias per host of DATABASE_REPLICA_HOSTS
+# (comma separated). The list endpoint reads the catalogue models from a
+# healthy replica, see utils.routers.
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, (os.getenv(
+        'DATABASE_REPLICA_HOSTS') or '').split(',')), 1):
+    alias = 'replica_%d' % number
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip(),
+                            TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['utils.routers.ReplicaRouter']
+DATABASE_REPLICA_MODELS = [
+    'services.Country',
+    'services.OpeningHours',
+    'services.Restaurant',
+    'services.RestaurantListing',
+    'services.RestaurantTrigram',
+    'services.UserBlocklistRestaurant',
+    'services.UserFavoriteRestaurant',
+]
+# seconds a user reads from default after changing their lists, longer
+# than the replication lag
+DATABASE_REPLICA_STICKY = 10
+# cache alias of the sticky markers, shared by the workers
+DATABASE_REPLICA_STICKY_CACHE = "throttle"
+# seconds a failing replica is skipped
+DATABASE_REPLICA_RETRY = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -201,7 +260,11 @@ LOGGING = {
             'level': 'ERROR',
             'filters': ['require_debug_false'],
             'class': 'django.utils.log.AdminEmailHandler'
-        }
+        },
+        'console': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+        },
     },
     'loggers': {
         'django.request': {
@@ -213,6 +276,11 @@ LOGGING = {
             'handlers': None,
             'propagate': False,
         },
+        'utils.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
 
@@ -256,9 +324,73 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.UserRateThrottle',
+        'utils.throttling.UserSlidingWindowThrottle',
     ),
     'DEFAULT_THROTTLE_RATES': {
         'user': '10/second'
     },
 }
+
+# OpenAPI document served by the root URL, written at deploy by
+# `manage.py generate_api_schema`, generated once per process when missing.
+API_SCHEMA_TITLE = 'Restaurant Choices API'
+API_SCHEMA_FILE = os.getenv('API_SCHEMA_FILE') or os.path.join(
+    BASE_DIR, 'api_schema.json')
+
+# In-process spatial index of restaurants answering the list endpoint radius
+# and nearest first queries, the SQL bounding box query is used when off.
+RESTAURANT_SPATIAL_INDEX = os.getenv('RESTAURANT_SPATIAL_INDEX') == 'on'
+# grid cell size in degrees
+RESTAURANT_SPATIAL_INDEX_CELL_SIZE = 0.25
+# seconds between incremental refreshes from Restaurant.updated/deleted
+RESTAURANT_SPATIAL_INDEX_REFRESH = 30
+# nearest first queries fall back to SQL beyond this many candidates
+RESTAURANT_SPATIAL_INDEX_MAX_CANDIDATES = 5000
+# miles, first bounding box of the nearest first queries without radius,
+# grown 4 times until it holds a page
+RESTAURANT_NEAREST_INITIAL_RADIUS = 10
+
+# seconds the per user favorite/blocklist id sets stay cached, they are also
+# invalidated whenever one of the lists is saved or deleted.
+USER_RESTAURANTS_CACHE_TTL = 300
+
+# seconds a process keeps its serialized Country lookup table
+COUNTRY_TABLE_TTL = 3600
+
+# render the restaurant list from .values() rows instead of going through
+# RestaurantSerializer, the JSON output is identical.
+RESTAURANT_FAST_SERIALIZER = os.getenv('RESTAURANT_FAST_SERIALIZER') == 'on'
+
+# cache of whole restaurant list responses, keyed on the search, paging, the
+# user favorite/blocklist version and the user coordinates rounded to
+# RESTAURANT_RESPONSE_CACHE_PRECISION decimals. Entries are dropped when any
+# restaurant changes and never outlive the next opening/closing time.
+RESTAURANT_RESPONSE_CACHE = os.getenv('RESTAURANT_RESPONSE_CACHE') == 'on'
+RESTAURANT_RESPONSE_CACHE_TTL = 60
+RESTAURANT_RESPONSE_CACHE_PRECISION = 3
+# cache alias of the catalogue version the responses are keyed on, shared
+# by the workers so that a change seen by one invalidates them everywhere
+CATALOGUE_VERSION_CACHE = "throttle"
+
+# read the restaurant list from the denormalized RestaurantListing table,
+# kept in sync by the Restaurant/Country signals and, for the writes made
+# without them, `manage.py sync_restaurant_listing` run periodically. It
+# re-reads the changes of the last RESTAURANT_LISTING_SYNC_OVERLAP seconds.
+RESTAURANT_LISTING = os.getenv('RESTAURANT_LISTING') == 'on'
+RESTAURANT_LISTING_SYNC_OVERLAP = 300
+
+# rows per query of the streaming restaurant export
+RESTAURANT_EXPORT_CHUNK_SIZE = 2000
+
+# run the independent queries of a request (user favorite/blocklist sets,
+# nearby candidates, count and page) concurrently in a per-process thread
+# pool, under WSGI and ASGI workers alike. Each pool thread holds its own
+# database connection.
+CONCURRENT_QUERIES = os.getenv('CONCURRENT_QUERIES') == 'on'
+CONCURRENT_QUERY_WORKERS = 4
+
+# fraction (0 to 1) of the requests whose query count, SQL, serializer and geo
+# timings are sent in the Server-Timing header and logged by
+# utils.instrumentation, 0 turns it off.
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE')
+                                    or 0)
@@ -0,0 +1,53 @@
+"""
+Production profile of the project settings, selected with:
+
+    DJANGO_SETTINGS_MODULE=restaurant_choices.settings_production
+
+DEBUG off, no development apps (debug toolbar, django-extensions, swagger)
+nor their middleware, cached template loaders, and the workers pre-warm
+the model metadata and URL resolver when restaurant_choices.wsgi/asgi is
+imported. SECRET_KEY (required) and ALLOWED_HOSTS (comma separated) come
+from the environment.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa F403
+
+DEBUG = False
+
+# never the development key of the repository
+SECRET_KEY = os.getenv('SECRET_KEY')  # noqa F405
+if not SECRET_KEY:
+    raise ImproperlyConfigured('the SECRET_KEY environment variable is '
+                               'required in production')
+ALLOWED_HOSTS = list(filter(None, (os.getenv(  # noqa F405
+    'ALLOWED_HOSTS') or '').split(','))) or ALLOWED_HOSTS  # noqa F405
+
+DEVELOPMENT_APPS = ['debug_toolbar', 'django_extensions',
+                    'rest_framework_swagger']
+INSTALLED_APPS = [app for app in INSTALLED_APPS  # noqa F405
+                  if app not in DEVELOPMENT_APPS]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE  # noqa F405
+              if not middleware.startswith('debug_toolbar.')]
+INTERNAL_IPS = []
+
+TEMPLATES = [dict(
+    TEMPLATES[0],  # noqa F405
+    # the loaders option replaces APP_DIRS
+    APP_DIRS=False,
+    OPTIONS=dict(
+        TEMPLATES[0]['OPTIONS'],  # noqa F405
+        context_processors=[
+            processor for processor in
+            TEMPLATES[0]['OPTIONS']['context_processors']  # noqa F405
+            if processor != 'django.template.context_processors.debug'],
+        loaders=[('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ])],
+    ),
+)]
+
+# utils.startup.prewarm when the wsgi/asgi application is loaded
+PREWARM = True
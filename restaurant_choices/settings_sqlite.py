@@ -0,0 +1,26 @@
+"""
+SQLite override of the project settings, runs the project (tests,
+benchmarks) without a MySQL server:
+
+    DJANGO_SETTINGS_MODULE=restaurant_choices.settings_sqlite \
+        python manage.py test services
+
+SQLITE_NAME selects the database file, ':memory:' keeps it in memory.
+"""
+
+from .settings import *  # noqa F403
+
+DATABASES = {
+    'default': dict(
+        DATABASES['default'],  # noqa F405
+        ENGINE=('utils.db_backends.sqlite3' if DB_POOL  # noqa F405
+                else 'django.db.backends.sqlite3'),
+        NAME=os.getenv('SQLITE_NAME') or os.path.join(  # noqa F405
+            BASE_DIR, 'db.sqlite3'),  # noqa F405
+        OPTIONS={}),
+}
+DATABASE_REPLICAS = []
+
+# the django_mysql JSONField (Restaurant.phones) requires a MySQL 5.7+
+# connection, SQLite stores it as text
+SILENCED_SYSTEM_CHECKS = ['django_mysql.E016']
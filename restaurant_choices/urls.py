@@ -19,12 +19,12 @@ from django.urls import include, path
 from django.conf.urls import url
 from django.conf import settings
 from django.views import defaults as default_views
-from rest_framework_swagger.views import get_swagger_view
+from services.views.schema import api_schema_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    url(r'^$', get_swagger_view(title='Restaurant Choices API')),
+    url(r'^$', api_schema_view, name='api_schema'),
     path('services/', include('services.urls'))
 ]
 
@@ -0,0 +1,120 @@
+# python
+from __future__ import unicode_literals
+from collections import namedtuple
+from functools import partial
+import hashlib
+import json
+import uuid
+# libs
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+# local
+from utils.concurrency import run_concurrently
+from .models import UserFavoriteRestaurant, UserBlocklistRestaurant
+
+
+USER_RESTAURANTS_KEY = 'services:user-restaurants:%s'
+CATALOGUE_VERSION_KEY = 'services:catalogue-version'
+RESPONSE_KEY = 'services:restaurant-response:%s'
+RESPONSE_HITS_KEY = 'services:restaurant-response-hits'
+RESPONSE_MISSES_KEY = 'services:restaurant-response-misses'
+
+UserRestaurants = namedtuple('UserRestaurants',
+                             ('favorites', 'blocklist', 'version'))
+
+
+def _restaurant_ids(model, user_id):
+    return frozenset(model.objects.filter(deleted__isnull=True, user=user_id)
+                     .values_list('restaurant', flat=True))
+
+
+def get_user_restaurants(user_id):
+    """Returns UserRestaurants(favorites, blocklist, version), frozensets of
+    the idRestaurant the user marked as favorite / blocked. Cached per user
+    until one of the lists changes, see services.signals. version changes
+    every time the lists are reloaded.
+    """
+    key = USER_RESTAURANTS_KEY % user_id
+    lists = cache.get(key)
+    if lists is None:
+        lists = UserRestaurants(*run_concurrently(*[
+            partial(_restaurant_ids, model, user_id)
+            for model in (UserFavoriteRestaurant, UserBlocklistRestaurant)
+        ]) + [uuid.uuid4().hex])
+        cache.set(key, lists, getattr(settings, 'USER_RESTAURANTS_CACHE_TTL',
+                                      300))
+    return lists
+
+
+def invalidate_on_commit(func, *args):
+    """Runs the cache invalidation func now and again once the current
+    transaction commits: requests reading the rows before the commit may
+    have cached them again in between.
+    """
+    func(*args)
+    transaction.on_commit(partial(func, *args))
+
+
+def invalidate_user_restaurants(user_id):
+    cache.delete(USER_RESTAURANTS_KEY % user_id)
+
+
+def version_cache():
+    """The settings.CATALOGUE_VERSION_CACHE cache alias, shared by the
+    workers so that a bump from any of them (or from import_restaurants)
+    invalidates the responses cached by all.
+    """
+    return caches[getattr(settings, 'CATALOGUE_VERSION_CACHE', 'default')]
+
+
+def catalogue_version():
+    versions = version_cache()
+    version = versions.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        versions.add(CATALOGUE_VERSION_KEY, 1, None)
+        version = versions.get(CATALOGUE_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalogue_version():
+    """Invalidates every cached restaurant list response."""
+    versions = version_cache()
+    versions.add(CATALOGUE_VERSION_KEY, 0, None)
+    try:
+        versions.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:  # evicted in between
+        versions.set(CATALOGUE_VERSION_KEY, 1, None)
+
+
+def response_cache_key(*parts):
+    """Cache key of a restaurant list response built from json serializable
+    parts identifying the query.
+    """
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str)
+                          .encode('utf-8')).hexdigest()
+    return RESPONSE_KEY % digest
+
+
+def get_cached_response(key):
+    payload = cache.get(key)
+    counter = RESPONSE_MISSES_KEY if payload is None else RESPONSE_HITS_KEY
+    cache.add(counter, 0, None)
+    try:
+        cache.incr(counter)
+    except ValueError:
+        pass
+    return payload
+
+
+def cache_response(key, payload, timeout):
+    cache.set(key, payload, timeout)
+
+
+def response_cache_stats():
+    hits, misses = (cache.get(RESPONSE_HITS_KEY, 0),
+                    cache.get(RESPONSE_MISSES_KEY, 0))
+    return {'hits': hits,
+            'misses': misses,
+            'hitRatio': round(hits / float(hits + misses), 4)
+            if hits + misses else None}
@@ -1,10 +1,12 @@
 # python
 from __future__ import unicode_literals
+from datetime import datetime
 # libs
-from utils.controllers import ControllerBase
+from utils.controllers import BOOLEAN_VALUES, ControllerBase
 from utils.exceptions import ServiceValidationError
 # local
 from ..models import Restaurant
+from ..search import normalize
 
 
 class RestaurantListController(ControllerBase):
@@ -13,7 +15,8 @@ class RestaurantListController(ControllerBase):
         model = Restaurant
         default_list_limit = 50
         max_list_limit = 100
-        allowed_ordering = ['idRestaurant', 'restaurantName', 'city', 'postcode']
+        allowed_ordering = ['idRestaurant', 'restaurantName', 'city', 'postcode',
+                            'distance', 'relevance']
         search_fields = {
             'idRestaurant': ('in', 'gt', 'lt', 'gte', 'lte', 'range'),
             'restaurantName': ('in', 'isnull', 'icontains', 'istartswith',
@@ -23,5 +26,125 @@ class RestaurantListController(ControllerBase):
             'postcode': ('in', 'isnull', 'icontains', 'istartswith',
                             'iendswith'),
         }
-        validation_order = ('search', 'exclude', 'limit', 'page', 'order')
-        error_class = 'Restaurant List Errors'
\ No newline at end of file
+        validation_order = ('search', 'exclude', 'limit', 'page', 'q', 'order',
+                            'cursor', 'userId', 'latitude', 'longitude',
+                            'radius', 'open_now', 'open_at')
+        error_class = 'Restaurant List Errors'
+        max_radius = 500
+        max_q_length = 100
+
+    def validate_q(self, q):
+        """Validates q, the free text search over the restaurant names and
+        cities, optional.
+
+        :param q: searched text
+        :type q: str
+        """
+        if q in (None, ''):
+            self.cleaned_data['q'] = None
+            return
+        if not isinstance(q, str) or len(q) > self._meta.max_q_length or \
+                not normalize(q):
+            raise ServiceValidationError('invalid q')
+        self.cleaned_data['q'] = q
+
+    def validate_order(self, order, replaceable=None):
+        """Most relevant first by default when searching with q, relevance
+        ordering needs q.
+        """
+        if not order and self.cleaned_data.get('q'):
+            order = '-relevance'
+        super(RestaurantListController, self).validate_order(order,
+                                                             replaceable)
+        if self.cleaned_data['order'].lstrip('-') == 'relevance' and \
+                not self.cleaned_data.get('q'):
+            self.cleaned_data['order'] = self._meta.allowed_ordering[0]
+
+    def validate_cursor(self, cursor):
+        super(RestaurantListController, self).validate_cursor(cursor)
+        key = self.cleaned_data['cursor']
+        if not key:
+            return
+        # [is_favorite, order value, idRestaurant]
+        if len(key) != 3 or not isinstance(key[0], bool) or \
+                not isinstance(key[2], int) or isinstance(key[2], bool) or \
+                not isinstance(key[1], (type(None), str, int, float)):
+            raise ServiceValidationError('invalid cursor')
+
+    def validate_userId(self, user_id):
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise ServiceValidationError('invalid userId')
+        if user_id <= 0:
+            raise ServiceValidationError('invalid userId')
+        self.cleaned_data['userId'] = user_id
+
+    def validate_latitude(self, latitude):
+        self.cleaned_data['latitude'] = self._coordinate(latitude, 90,
+                                                         'invalid latitude')
+
+    def validate_longitude(self, longitude):
+        self.cleaned_data['longitude'] = self._coordinate(longitude, 180,
+                                                          'invalid longitude')
+
+    def validate_radius(self, radius):
+        """Validates radius (miles) of the nearby search, optional unless
+        ordering by -distance.
+
+        :param radius: maximum distance between user and restaurant
+        :type radius: float
+        """
+        if radius in (None, ''):
+            # farthest first can't be bounded, it would scan everything
+            if self.cleaned_data.get('order') == '-distance':
+                raise ServiceValidationError('radius required by -distance')
+            self.cleaned_data['radius'] = None
+            return
+        try:
+            radius = float(radius)
+        except (TypeError, ValueError):
+            raise ServiceValidationError('invalid radius')
+        if not 0 < radius <= self._meta.max_radius:
+            raise ServiceValidationError('invalid radius')
+        self.cleaned_data['radius'] = radius
+
+    def validate_open_now(self, open_now):
+        """Validates open_now, true keeps the restaurants open at the time
+        of the request.
+
+        :param open_now: 'true' or 'false'
+        :type open_now: str
+        """
+        if open_now in (None, ''):
+            self.cleaned_data['open_now'] = False
+            return
+        if not isinstance(open_now, str) or \
+                open_now.lower() not in BOOLEAN_VALUES:
+            raise ServiceValidationError('invalid open_now')
+        self.cleaned_data['open_now'] = open_now.lower() == 'true'
+
+    def validate_open_at(self, open_at):
+        """Validates open_at, keeps the restaurants open today at that time
+        (utc). Takes precedence over open_now.
+
+        :param open_at: HH:MM
+        :type open_at: str
+        """
+        if open_at in (None, ''):
+            self.cleaned_data['open_at'] = None
+            return
+        try:
+            self.cleaned_data['open_at'] = datetime.strptime(
+                open_at, '%H:%M').time()
+        except (TypeError, ValueError):
+            raise ServiceValidationError('invalid open_at')
+
+    def _coordinate(self, value, bound, error_code):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ServiceValidationError(error_code)
+        if not -bound <= value <= bound:
+            raise ServiceValidationError(error_code)
+        return value
\ No newline at end of file
@@ -0,0 +1,33 @@
+# python
+from __future__ import unicode_literals
+# libs
+from utils.controllers import ControllerBase
+from utils.exceptions import ServiceValidationError
+# local
+from ..models import UserFavoriteRestaurant
+
+
+class UserRestaurantListController(ControllerBase):
+
+    class Meta:
+        model = UserFavoriteRestaurant
+        max_restaurants = 1000
+        validation_order = ('restaurants',)
+        error_class = 'User Restaurant List Errors'
+
+    def validate_restaurants(self, restaurants):
+        """Validates the restaurant ids of a favorite/blocklist change.
+
+        :param restaurants: idRestaurant values, duplicates are ignored
+        :type restaurants: list
+        """
+        if not isinstance(restaurants, list) or not restaurants:
+            raise ServiceValidationError('restaurants must be a list of ids')
+        if len(restaurants) > self._meta.max_restaurants:
+            raise ServiceValidationError('too many restaurants')
+        ids = set()
+        for pk in restaurants:
+            if not isinstance(pk, int) or isinstance(pk, bool) or pk <= 0:
+                raise ServiceValidationError('invalid restaurant id')
+            ids.add(pk)
+        self.cleaned_data['restaurants'] = ids
@@ -0,0 +1,82 @@
+# python
+from __future__ import unicode_literals
+from datetime import datetime
+# libs
+from django.db.models import Exists, OuterRef
+# local
+from .models import OpeningHours, Restaurant
+
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def minute_of_day(value, up=False):
+    """Minutes since midnight of the time value, counting the started
+    minute when up.
+    """
+    minute = value.hour * 60 + value.minute
+    if up and (value.second or value.microsecond):
+        minute += 1
+    return minute
+
+
+def opening_ranges(opening, closing):
+    """Returns the (weekday, opens, closes) rows of an openingTime /
+    closingTime pair applying every day, matching status_distance: both
+    ends are included and an opening time at or after the closing time
+    means open over midnight.
+    """
+    opens, closes = minute_of_day(opening, up=True), minute_of_day(closing)
+    if opening < closing:
+        ranges = [(opens, closes)]
+    else:
+        ranges = [(0, closes), (opens, MINUTES_PER_DAY)]
+    return [(weekday, start, end) for weekday in range(7)
+            for start, end in ranges]
+
+
+def previous_hours(pks):
+    """Maps the idRestaurant of the saved restaurants among pks to their
+    stored (openingTime, closingTime).
+    """
+    return {pk: (opening, closing) for pk, opening, closing in
+            Restaurant.objects.filter(idRestaurant__in=list(pks))
+            .values_list('idRestaurant', 'openingTime', 'closingTime')}
+
+
+def sync_opening_hours(restaurants, previous=None):
+    """Rebuilds the OpeningHours rows of the restaurants from their
+    openingTime/closingTime. With previous (see previous_hours) only the
+    restaurants whose times changed are rebuilt, the intervals added to
+    the others are kept.
+
+    :param restaurants: (idRestaurant, openingTime, closingTime) tuples
+    """
+    restaurants = [(pk, opening, closing)
+                   for pk, opening, closing in restaurants
+                   if previous is None or
+                   previous.get(pk) != (opening, closing)]
+    if not restaurants:
+        return
+    OpeningHours.objects.filter(
+        restaurant__in=[pk for pk, _, _ in restaurants]).delete()
+    OpeningHours.objects.bulk_create([
+        OpeningHours(restaurant_id=pk, weekday=weekday, opens=opens,
+                     closes=closes)
+        for pk, opening, closing in restaurants
+        for weekday, opens, closes in opening_ranges(opening, closing)])
+
+
+def open_at_q(when=None):
+    """Filter of the restaurants open at the datetime when (utc now by
+    default), an indexed EXISTS on OpeningHours. Minutes are compared
+    like status_distance compares the times: past the first second of a
+    minute, a restaurant closing at that minute is closed.
+    """
+    when = when or datetime.utcnow()
+    minute = minute_of_day(when)
+    hours = OpeningHours.objects.filter(
+        restaurant=OuterRef('pk'), weekday=when.weekday(),
+        opens__lte=minute,
+        closes__gte=minute + (1 if when.second or when.microsecond else 0))
+    return Exists(hours)
@@ -0,0 +1,133 @@
+# python
+from __future__ import unicode_literals
+from datetime import timedelta
+# libs
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+# local
+from .hours import minute_of_day
+from .models import Country, Restaurant, RestaurantListing
+from .search import search_values
+
+
+def country_values(country):
+    """Inlined country columns of the RestaurantListing rows."""
+    return {'idCountry': country.idCountry,
+            'countryA2Code': country.a2Code,
+            'countryA3Code': country.a3Code,
+            'countryName': country.countryName,
+            'countryPhonePrefix': country.phonePrefix,
+            'countryIdFlag': country.idFlag,
+            'countryCreated': country.created,
+            'countryUpdated': country.updated}
+
+
+def listing_values(restaurant, country):
+    """Field values of the RestaurantListing row of an active restaurant
+    and its country, model instances or anything with their attributes
+    (eg. historical models in migrations).
+    """
+    opening, closing = restaurant.openingTime, restaurant.closingTime
+    values = country_values(country)
+    values.update(search_values(restaurant.restaurantName, restaurant.city))
+    values.update(
+        idRestaurant=restaurant.idRestaurant,
+        restaurantName=restaurant.restaurantName,
+        address1=restaurant.address1,
+        address2=restaurant.address2,
+        address3=restaurant.address3,
+        city=restaurant.city,
+        postcode=restaurant.postcode,
+        phones=restaurant.phones,
+        email=restaurant.email,
+        website=restaurant.website,
+        vatNumber=restaurant.vatNumber,
+        currency=restaurant.currency,
+        latitude=float(restaurant.latitude),
+        longitude=float(restaurant.longitude),
+        openingTime=opening,
+        closingTime=closing,
+        # the same minutes as services.hours.opening_ranges
+        opens=minute_of_day(opening, up=True),
+        closes=minute_of_day(closing),
+        overnight=not opening < closing,
+        created=restaurant.created,
+        updated=restaurant.updated)
+    return values
+
+
+def sync_listing(pks):
+    """Rebuilds the RestaurantListing rows of the restaurants pks from
+    Restaurant, the deleted ones lose their row.
+
+    :param pks: idRestaurant values
+    """
+    pks = list(pks)
+    if not pks:
+        return
+    restaurants = Restaurant.objects.filter(
+        idRestaurant__in=pks, deleted__isnull=True).select_related('country')
+    rows = [RestaurantListing(**listing_values(restaurant, restaurant.country))
+            for restaurant in restaurants]
+    with transaction.atomic():
+        RestaurantListing.objects.filter(idRestaurant__in=pks).delete()
+        RestaurantListing.objects.bulk_create(rows)
+
+
+def sync_country(country):
+    """Updates the inlined country of the RestaurantListing rows."""
+    RestaurantListing.objects.filter(idCountry=country.idCountry)\
+        .update(**country_values(country))
+
+
+def _sync_batches(restaurants, batch_size):
+    pks = restaurants.order_by('idRestaurant')\
+        .values_list('idRestaurant', flat=True)
+    synced, last = 0, 0
+    while True:
+        batch = list(pks.filter(idRestaurant__gt=last)[:batch_size])
+        if not batch:
+            return synced
+        sync_listing(batch)
+        synced += len(batch)
+        last = batch[-1]
+
+
+def rebuild_listing(batch_size=1000):
+    """Rebuilds every RestaurantListing row, returns the number of
+    restaurants synced.
+    """
+    # hard deleted restaurants
+    RestaurantListing.objects.exclude(
+        idRestaurant__in=Restaurant.objects.values('idRestaurant')).delete()
+    return _sync_batches(Restaurant.objects.all(), batch_size)
+
+
+def refresh_listing(batch_size=1000):
+    """Incremental rebuild of the RestaurantListing rows from the
+    Restaurant.updated/deleted and Country.updated timestamps newer than
+    the ones already listed, minus settings.RESTAURANT_LISTING_SYNC_OVERLAP
+    seconds for the transactions still running back then. It catches the
+    changes made without signals (queryset.update(), raw SQL) as long as
+    they touch updated or deleted. Returns the number of restaurants
+    synced.
+    """
+    marks = RestaurantListing.objects.aggregate(updated=Max('updated'),
+                                                country=Max('countryUpdated'))
+    if marks['updated'] is None:
+        return rebuild_listing(batch_size)
+    overlap = timedelta(seconds=getattr(
+        settings, 'RESTAURANT_LISTING_SYNC_OVERLAP', 300))
+
+    for country in Country.objects.filter(
+            updated__gte=marks['country'] - overlap):
+        sync_country(country)
+    # soft deletes leave updated untouched when made by queryset.update()
+    RestaurantListing.objects.filter(idRestaurant__in=Restaurant.objects
+                                     .filter(deleted__isnull=False)
+                                     .values('idRestaurant')).delete()
+
+    since = marks['updated'] - overlap
+    return _sync_batches(Restaurant.objects.filter(
+        Q(updated__gte=since) | Q(deleted__gte=since)), batch_size)
@@ -0,0 +1,35 @@
+# python
+from __future__ import unicode_literals
+import os
+# libs
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+# local
+from utils.schemas import generate_schema
+
+
+class Command(BaseCommand):
+    help = ('Writes the OpenAPI document of the API to API_SCHEMA_FILE, '
+            'served as it is by the root URL. Run it once per deploy, '
+            'the production install then needs neither coreapi nor '
+            'django-rest-swagger.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='file written instead of '
+                                             'API_SCHEMA_FILE')
+
+    def handle(self, output=None, **options):
+        path = output or getattr(settings, 'API_SCHEMA_FILE', None)
+        if not path:
+            raise CommandError('API_SCHEMA_FILE is not set')
+        try:
+            content = generate_schema()
+        except ImportError as e:
+            raise CommandError('the schema generation needs coreapi and '
+                               'django-rest-swagger: %s' % e)
+        # replaced at once, running workers never read half a file
+        temporary = '%s.tmp' % path
+        with open(temporary, 'wb') as f:
+            f.write(content)
+        os.replace(temporary, path)
+        self.stdout.write('%d bytes written to %s' % (len(content), path))
@@ -0,0 +1,259 @@
+# python
+from __future__ import unicode_literals
+import csv
+import io
+import itertools
+import json
+import sys
+import time
+# libs
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+# local
+from ...cache import bump_catalogue_version
+from ...hours import previous_hours, sync_opening_hours
+from ...listing import sync_listing
+from ...models import Country, Restaurant
+from ...search import search_values, sync_search_index
+
+
+# fields read from the file, idRestaurant is optional and the upsert key
+IMPORT_FIELDS = [f for f in Restaurant._meta.concrete_fields
+                 if f.name not in ('created', 'updated', 'deleted',
+                                   'country', 'searchName', 'searchCity')]
+COORDINATE_BOUNDS = {'latitude': 90, 'longitude': 180}
+
+
+class RowError(Exception):
+
+    def __init__(self, line, errors):
+        super(RowError, self).__init__('line %s: %s' % (line, errors))
+        self.line = line
+        self.errors = errors
+
+
+def read_rows(stream, fmt):
+    """Yields (line number, dict) for every record of a csv (with header)
+    or json-lines stream.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line, text in enumerate(stream, 1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as e:
+                    yield line, RowError(line, {'row': str(e)})
+
+
+def load_countries():
+    """Maps the A2 and A3 codes and the ids of every country to idCountry."""
+    countries = dict()
+    for pk, a2, a3 in Country.objects.filter(deleted__isnull=True)\
+            .values_list('idCountry', 'a2Code', 'a3Code'):
+        countries[str(pk)] = pk
+        for code in (a2, a3):
+            if code:
+                countries[code.upper()] = pk
+    return countries
+
+
+def clean_row(line, row, countries):
+    """Validates a raw row against the Restaurant fields, returns the dict
+    of python values keyed on the field attname. Raises RowError.
+    """
+    if isinstance(row, RowError):
+        raise row
+    if not isinstance(row, dict):
+        raise RowError(line, {'row': 'not an object'})
+    errors = dict()
+    cleaned = dict()
+    country = row.get('country', row.get('idCountry'))
+    cleaned['country_id'] = countries.get(str(country or '').strip().upper())
+    if cleaned['country_id'] is None:
+        errors['country'] = 'unknown country %r' % country
+    for field in IMPORT_FIELDS:
+        value = row.get(field.name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            if field.primary_key:
+                continue
+            if field.has_default():
+                cleaned[field.attname] = field.get_default()
+                continue
+            value = None
+        elif isinstance(value, float):
+            # json numbers, Decimal(str) keeps the decimal places as written
+            value = str(value)
+        elif field.name == 'phones' and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                errors[field.name] = 'invalid json'
+                continue
+        try:
+            value = field.clean(value, None)
+        except ValidationError as e:
+            errors[field.name] = ' '.join(e.messages)
+            continue
+        bound = COORDINATE_BOUNDS.get(field.name)
+        if bound is not None and abs(value) > bound:
+            errors[field.name] = 'out of range'
+            continue
+        if field.name == 'phones' and not isinstance(value, dict):
+            errors[field.name] = 'must be an object'
+            continue
+        cleaned[field.attname] = value
+    if errors:
+        raise RowError(line, errors)
+    cleaned.update(search_values(cleaned['restaurantName'], cleaned['city']))
+    return cleaned
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def upsert(rows, now):
+    """Inserts the rows, updating the restaurants whose idRestaurant
+    already exists in a single INSERT ... ON DUPLICATE KEY UPDATE (MySQL)
+    or ON CONFLICT DO UPDATE statement per chunk. Imported restaurants are
+    (re)activated.
+    """
+    opts = Restaurant._meta
+    pk = opts.pk
+    has_pk = pk.attname in rows[0]
+    qn = connection.ops.quote_name
+    fields = [f for f in opts.concrete_fields
+              if not f.primary_key or has_pk]
+    columns = ', '.join(qn(f.column) for f in fields)
+    placeholders = '(%s)' % ', '.join(['%s'] * len(fields))
+    updates = [f.column for f in fields if f.name not in ('created',)
+               and not f.primary_key]
+    if connection.vendor == 'mysql':
+        conflict = ' ON DUPLICATE KEY UPDATE ' + ', '.join(
+            '%s = VALUES(%s)' % (qn(c), qn(c)) for c in updates)
+    else:
+        conflict = ' ON CONFLICT (%s) DO UPDATE SET %s' % (
+            qn(pk.column),
+            ', '.join('%s = excluded.%s' % (qn(c), qn(c)) for c in updates))
+    values = dict(created=now, updated=now, deleted=None)
+
+    size = connection.ops.bulk_batch_size(fields, rows)
+    with connection.cursor() as cursor:
+        for chunk in batched(rows, size):
+            params = list()
+            for row in chunk:
+                values.update(row)
+                params.extend(f.get_db_prep_save(values[f.attname],
+                                                 connection)
+                              for f in fields)
+            sql = 'INSERT INTO %s (%s) VALUES %s' % (
+                qn(opts.db_table), columns,
+                ', '.join([placeholders] * len(chunk)))
+            if has_pk:
+                sql += conflict
+            cursor.execute(sql, params)
+
+
+class Command(BaseCommand):
+    help = ('Streams restaurants from a csv or json-lines file into the '
+            'Restaurant table. Rows with an idRestaurant update the existing '
+            'restaurant, the country column takes the A2/A3 code or id.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="file to import, '-' for stdin")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--strict', action='store_true',
+                            help='stop at the first invalid row')
+        parser.add_argument('--report-every', type=int, default=100000,
+                            help='rows between progress reports')
+
+    def handle(self, path, format=None, batch_size=1000, strict=False,
+               report_every=100000, **options):
+        fmt = format or ('jsonl' if path.endswith(('.jsonl', '.json'))
+                         else 'csv')
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8',
+                                      newline='')
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except IOError as e:
+                raise CommandError(e)
+
+        countries = load_countries()
+        self.invalid = 0
+
+        def valid_rows():
+            for line, row in read_rows(stream, fmt):
+                try:
+                    yield clean_row(line, row, countries)
+                except RowError as e:
+                    if strict:
+                        raise CommandError(e)
+                    self.invalid += 1
+                    self.stderr.write(str(e))
+
+        imported, reported = 0, 0
+        started = time.monotonic()
+        try:
+            for batch in batched(valid_rows(), batch_size):
+                now = timezone.now()
+                # rows with and without idRestaurant insert different columns
+                with transaction.atomic():
+                    last = Restaurant.objects.aggregate(
+                        last=Max('idRestaurant'))['last'] or 0
+                    # updated rows keeping their times keep their hours
+                    previous = previous_hours(
+                        row['idRestaurant'] for row in batch
+                        if row.get('idRestaurant', last + 1) <= last)
+                    for _, rows in itertools.groupby(
+                            batch, key=lambda row: 'idRestaurant' in row):
+                        upsert(list(rows), now)
+                    # raw inserts send no post_save, new rows got ids > last
+                    synced = [(row['idRestaurant'], row['openingTime'],
+                               row['closingTime'], row['restaurantName'],
+                               row['city']) for row in batch
+                              if 'idRestaurant' in row and
+                              row['idRestaurant'] <= last] + \
+                        list(Restaurant.objects.filter(idRestaurant__gt=last)
+                             .values_list('idRestaurant', 'openingTime',
+                                          'closingTime', 'restaurantName',
+                                          'city'))
+                    sync_opening_hours((row[:3] for row in synced),
+                                       previous=previous)
+                    sync_search_index((row[0],) + tuple(row[3:])
+                                      for row in synced)
+                    sync_listing(row[0] for row in synced)
+                imported += len(batch)
+                if imported - reported >= report_every:
+                    reported = imported
+                    self.report(imported, started)
+        finally:
+            stream.close()
+            if imported:
+                bump_catalogue_version()
+        if imported != reported or not imported:
+            self.report(imported, started)
+
+    def report(self, imported, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write('%d rows imported, %d invalid, %.0f rows/sec' % (
+            imported, self.invalid, imported / elapsed if elapsed else 0))
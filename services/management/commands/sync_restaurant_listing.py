@@ -0,0 +1,27 @@
+# python
+from __future__ import unicode_literals
+import time
+# libs
+from django.core.management.base import BaseCommand, CommandError
+# local
+from ...listing import rebuild_listing, refresh_listing
+
+
+class Command(BaseCommand):
+    help = ('Brings the RestaurantListing read model up to date with the '
+            'restaurants and countries changed since the last sync, or '
+            'rebuilds it with --full. Run it periodically when rows are '
+            'written without the model signals.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='rebuild every row')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, full=False, batch_size=1000, **options):
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+        started = time.monotonic()
+        synced = (rebuild_listing if full else refresh_listing)(batch_size)
+        self.stdout.write('%d restaurants synced in %.1fs' % (
+            synced, time.monotonic() - started))
@@ -0,0 +1,55 @@
+# Generated by Django 3.0.5 on 2026-10-18 16:20
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keeps a single row per (user, restaurant) before the unique
+    constraints are created, preferring the active one.
+    """
+    for model_name in ('UserFavoriteRestaurant', 'UserBlocklistRestaurant'):
+        model = apps.get_model('services', model_name)
+        duplicates = model.objects.values('user', 'restaurant')\
+            .annotate(rows=Count('pk'), keep=Min('pk')).filter(rows__gt=1)
+        for row in duplicates:
+            rows = model.objects.filter(user=row['user'],
+                                        restaurant=row['restaurant'])
+            keep = rows.filter(deleted__isnull=True).order_by('pk').first()
+            keep_pk = keep.pk if keep else row['keep']
+            rows.exclude(pk=keep_pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['deleted', 'latitude', 'longitude'], name='restaurant_deleted_geo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['deleted', 'city'], name='restaurant_deleted_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userblocklistrestaurant',
+            index=models.Index(fields=['user', 'deleted', 'restaurant'], name='blocklist_user_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfavoriterestaurant',
+            index=models.Index(fields=['user', 'deleted', 'restaurant'], name='favorite_user_deleted_idx'),
+        ),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userblocklistrestaurant',
+            constraint=models.UniqueConstraint(fields=('user', 'restaurant'), name='blocklist_user_restaurant_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='userfavoriterestaurant',
+            constraint=models.UniqueConstraint(fields=('user', 'restaurant'), name='favorite_user_restaurant_uniq'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.0.5 on 2026-10-18 16:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_opening_hours(apps, schema_editor):
+    """Builds the OpeningHours rows of the existing restaurants."""
+    from services.hours import opening_ranges
+
+    Restaurant = apps.get_model('services', 'Restaurant')
+    OpeningHours = apps.get_model('services', 'OpeningHours')
+    rows = Restaurant.objects.order_by('pk').values_list(
+        'pk', 'openingTime', 'closingTime')
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:1000])
+        if not batch:
+            return
+        OpeningHours.objects.bulk_create([
+            OpeningHours(restaurant_id=pk, weekday=weekday, opens=opens,
+                         closes=closes)
+            for pk, opening, closing in batch
+            for weekday, opens, closes in opening_ranges(opening, closing)])
+        last = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('idOpeningHours', models.AutoField(primary_key=True, serialize=False)),
+                ('weekday', models.SmallIntegerField(db_column='Weekday')),
+                ('opens', models.SmallIntegerField(db_column='Opens')),
+                ('closes', models.SmallIntegerField(db_column='Closes')),
+                ('restaurant', models.ForeignKey(db_column='idRestaurant', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='openingHours', to='services.Restaurant')),
+            ],
+            options={
+                'db_table': 'OpeningHours',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='openinghours',
+            index=models.Index(fields=['restaurant', 'weekday', 'opens', 'closes'], name='opening_hours_lookup_idx'),
+        ),
+        migrations.RunPython(populate_opening_hours,
+                             migrations.RunPython.noop),
+    ]
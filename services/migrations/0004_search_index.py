@@ -0,0 +1,88 @@
+# Generated by Django 3.0.5 on 2026-10-18 16:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_search_index(apps, schema_editor):
+    """Fills the search columns and the RestaurantTrigram rows of the
+    existing restaurants."""
+    from services.search import CITY, NAME, document_trigrams, search_values
+
+    Restaurant = apps.get_model('services', 'Restaurant')
+    RestaurantTrigram = apps.get_model('services', 'RestaurantTrigram')
+    rows = Restaurant.objects.order_by('pk').only(
+        'pk', 'restaurantName', 'city')
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:1000])
+        if not batch:
+            return
+        trigrams = list()
+        for restaurant in batch:
+            for name, value in search_values(restaurant.restaurantName,
+                                             restaurant.city).items():
+                setattr(restaurant, name, value)
+            for field, value in ((NAME, restaurant.searchName),
+                                 (CITY, restaurant.searchCity)):
+                trigrams.extend(RestaurantTrigram(
+                    restaurant_id=restaurant.pk, field=field, trigram=trigram)
+                    for trigram in document_trigrams(value))
+        Restaurant.objects.bulk_update(batch, ['searchName', 'searchCity'])
+        RestaurantTrigram.objects.bulk_create(trigrams)
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_opening_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantTrigram',
+            fields=[
+                ('idRestaurantTrigram', models.AutoField(primary_key=True, serialize=False)),
+                ('field', models.SmallIntegerField(db_column='Field')),
+                ('trigram', models.CharField(db_column='Trigram', max_length=3)),
+            ],
+            options={
+                'db_table': 'RestaurantTrigram',
+            },
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='searchCity',
+            field=models.CharField(db_column='SearchCity', default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='searchName',
+            field=models.CharField(db_column='SearchName', default='', editable=False, max_length=250),
+        ),
+        migrations.AddField(
+            model_name='restauranttrigram',
+            name='restaurant',
+            field=models.ForeignKey(db_column='idRestaurant', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='services.Restaurant'),
+        ),
+        # indexes are built after the rows are in
+        migrations.RunPython(populate_search_index,
+                             migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['deleted', 'searchName'], name='restaurant_search_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['deleted', 'searchCity'], name='restaurant_search_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restauranttrigram',
+            index=models.Index(fields=['trigram', 'field', 'restaurant'], name='restaurant_trigram_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restauranttrigram',
+            index=models.Index(fields=['restaurant', 'field', 'trigram'], name='restaurant_trigram_rest_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 3.0.5 on 2026-10-18 17:06
+
+from django.db import migrations, models
+import django_mysql.models
+
+
+def populate_listing(apps, schema_editor):
+    """Builds the RestaurantListing rows of the active restaurants."""
+    from services.listing import listing_values
+
+    Restaurant = apps.get_model('services', 'Restaurant')
+    RestaurantListing = apps.get_model('services', 'RestaurantListing')
+    rows = Restaurant.objects.filter(deleted__isnull=True)\
+        .select_related('country').order_by('pk')
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:1000])
+        if not batch:
+            return
+        RestaurantListing.objects.bulk_create([
+            RestaurantListing(**listing_values(restaurant, restaurant.country))
+            for restaurant in batch])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantListing',
+            fields=[
+                ('idRestaurant', models.IntegerField(db_column='idRestaurant', primary_key=True, serialize=False)),
+                ('idCountry', models.IntegerField(db_column='idCountry')),
+                ('countryA2Code', models.CharField(db_column='CountryA2', max_length=2, null=True)),
+                ('countryA3Code', models.CharField(db_column='CountryA3', max_length=3, null=True)),
+                ('countryName', models.CharField(db_column='CountryName', max_length=50)),
+                ('countryPhonePrefix', models.IntegerField(db_column='CountryPhonePrefix', null=True)),
+                ('countryIdFlag', models.IntegerField(db_column='CountryIdFlag', null=True)),
+                ('countryCreated', models.DateTimeField(db_column='CountryCreated')),
+                ('countryUpdated', models.DateTimeField(db_column='CountryUpdated')),
+                ('restaurantName', models.CharField(db_column='GroupName', max_length=250)),
+                ('address1', models.CharField(db_column='Address1', max_length=100)),
+                ('address2', models.CharField(db_column='Address2', max_length=100, null=True)),
+                ('address3', models.CharField(db_column='Address3', max_length=100, null=True)),
+                ('city', models.CharField(db_column='City', max_length=50)),
+                ('postcode', models.CharField(db_column='PostCode', max_length=20, null=True)),
+                ('phones', django_mysql.models.JSONField(db_column='phones', default=dict)),
+                ('email', models.CharField(db_column='Email', max_length=255, null=True)),
+                ('website', models.CharField(db_column='Website', max_length=50, null=True)),
+                ('vatNumber', models.CharField(db_column='VATNumber', max_length=20, null=True)),
+                ('currency', models.CharField(db_column='Currency', max_length=20, null=True)),
+                ('searchName', models.CharField(db_column='SearchName', max_length=250)),
+                ('searchCity', models.CharField(db_column='SearchCity', max_length=50)),
+                ('latitude', models.FloatField(db_column='Latitude')),
+                ('longitude', models.FloatField(db_column='Longitude')),
+                ('openingTime', models.TimeField(db_column='OpeningTime')),
+                ('closingTime', models.TimeField(db_column='ClosingTime')),
+                ('opens', models.SmallIntegerField(db_column='Opens')),
+                ('closes', models.SmallIntegerField(db_column='Closes')),
+                ('overnight', models.BooleanField(db_column='Overnight')),
+                ('created', models.DateTimeField(db_column='Created')),
+                ('updated', models.DateTimeField(db_column='Updated')),
+            ],
+            options={
+                'db_table': 'RestaurantListing',
+            },
+        ),
+        migrations.RunPython(populate_listing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='restaurantlisting',
+            index=models.Index(fields=['latitude', 'longitude'], name='listing_geo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantlisting',
+            index=models.Index(fields=['city'], name='listing_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantlisting',
+            index=models.Index(fields=['searchName'], name='listing_search_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantlisting',
+            index=models.Index(fields=['searchCity'], name='listing_search_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantlisting',
+            index=models.Index(fields=['idCountry'], name='listing_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantlisting',
+            index=models.Index(fields=['updated'], name='listing_updated_idx'),
+        ),
+    ]
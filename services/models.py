@@ -69,10 +69,134 @@ class Restaurant(TimeStampedModel):
                                    db_column='Latitude')
     longitude = models.DecimalField(max_digits=9, decimal_places=6,
                                     db_column='Longitude')
+    # lowercased, accent stripped copies of restaurantName and city kept
+    # up to date by services.signals, see services.search
+    searchName = models.CharField(db_column='SearchName', max_length=250,
+                                  default='', editable=False)
+    searchCity = models.CharField(db_column='SearchCity', max_length=50,
+                                  default='', editable=False)
 
     class Meta:
         db_table = 'Restaurant'
         ordering = ['restaurantName']
+        indexes = [
+            models.Index(fields=['deleted', 'latitude', 'longitude'],
+                         name='restaurant_deleted_geo_idx'),
+            models.Index(fields=['deleted', 'city'],
+                         name='restaurant_deleted_city_idx'),
+            models.Index(fields=['deleted', 'searchName'],
+                         name='restaurant_search_name_idx'),
+            models.Index(fields=['deleted', 'searchCity'],
+                         name='restaurant_search_city_idx'),
+        ]
+
+
+class OpeningHours(models.Model):
+    '''
+    DB structure to store the opening intervals of a restaurant per day of
+    week (0 is Monday) as minutes of the day, both ends included. Over
+    midnight intervals are split at midnight, see services.hours
+    '''
+    idOpeningHours = models.AutoField(primary_key=True)
+    restaurant = models.ForeignKey(Restaurant, db_column='idRestaurant',
+                                   related_name='openingHours',
+                                   on_delete=models.CASCADE, db_index=False)
+    weekday = models.SmallIntegerField(db_column='Weekday')
+    opens = models.SmallIntegerField(db_column='Opens')
+    closes = models.SmallIntegerField(db_column='Closes')
+
+    class Meta:
+        db_table = 'OpeningHours'
+        indexes = [
+            models.Index(fields=['restaurant', 'weekday', 'opens', 'closes'],
+                         name='opening_hours_lookup_idx'),
+        ]
+
+
+class RestaurantTrigram(models.Model):
+    '''
+    DB structure to store the trigrams of the normalized restaurant name
+    (field 0) and city (field 1) serving the substring and relevance
+    searches, see services.search
+    '''
+    idRestaurantTrigram = models.AutoField(primary_key=True)
+    restaurant = models.ForeignKey(Restaurant, db_column='idRestaurant',
+                                   related_name='trigrams',
+                                   on_delete=models.CASCADE, db_index=False)
+    field = models.SmallIntegerField(db_column='Field')
+    trigram = models.CharField(db_column='Trigram', max_length=3)
+
+    class Meta:
+        db_table = 'RestaurantTrigram'
+        indexes = [
+            models.Index(fields=['trigram', 'field', 'restaurant'],
+                         name='restaurant_trigram_idx'),
+            models.Index(fields=['restaurant', 'field', 'trigram'],
+                         name='restaurant_trigram_rest_idx'),
+        ]
+
+
+class RestaurantListing(models.Model):
+    '''
+    DB structure to store the denormalized read model of the restaurant
+    list: one row per active restaurant with its country inlined, float
+    coordinates and the opening/closing minutes of the day. Maintained by
+    services.listing
+    '''
+    idRestaurant = models.IntegerField(primary_key=True,
+                                       db_column='idRestaurant')
+    idCountry = models.IntegerField(db_column='idCountry')
+    countryA2Code = models.CharField(db_column='CountryA2', max_length=2,
+                                     null=True)
+    countryA3Code = models.CharField(db_column='CountryA3', max_length=3,
+                                     null=True)
+    countryName = models.CharField(db_column='CountryName', max_length=50)
+    countryPhonePrefix = models.IntegerField(db_column='CountryPhonePrefix',
+                                             null=True)
+    countryIdFlag = models.IntegerField(db_column='CountryIdFlag', null=True)
+    countryCreated = models.DateTimeField(db_column='CountryCreated')
+    countryUpdated = models.DateTimeField(db_column='CountryUpdated')
+    restaurantName = models.CharField(db_column='GroupName', max_length=250)
+    address1 = models.CharField(db_column='Address1', max_length=100)
+    address2 = models.CharField(null=True, db_column='Address2',
+                                max_length=100)
+    address3 = models.CharField(null=True, db_column='Address3',
+                                max_length=100)
+    city = models.CharField(db_column='City', max_length=50)
+    postcode = models.CharField(null=True, db_column='PostCode',
+                                max_length=20)
+    phones = JSONField(db_column='phones', default=dict)
+    email = models.CharField(null=True, db_column='Email', max_length=255)
+    website = models.CharField(null=True, db_column='Website', max_length=50)
+    vatNumber = models.CharField(null=True, db_column='VATNumber',
+                                 max_length=20)
+    currency = models.CharField(null=True, db_column='Currency',
+                                max_length=20)
+    searchName = models.CharField(db_column='SearchName', max_length=250)
+    searchCity = models.CharField(db_column='SearchCity', max_length=50)
+    latitude = models.FloatField(db_column='Latitude')
+    longitude = models.FloatField(db_column='Longitude')
+    openingTime = models.TimeField(db_column='OpeningTime')
+    closingTime = models.TimeField(db_column='ClosingTime')
+    opens = models.SmallIntegerField(db_column='Opens')
+    closes = models.SmallIntegerField(db_column='Closes')
+    overnight = models.BooleanField(db_column='Overnight')
+    created = models.DateTimeField(db_column='Created')
+    updated = models.DateTimeField(db_column='Updated')
+
+    class Meta:
+        db_table = 'RestaurantListing'
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'],
+                         name='listing_geo_idx'),
+            models.Index(fields=['city'], name='listing_city_idx'),
+            models.Index(fields=['searchName'],
+                         name='listing_search_name_idx'),
+            models.Index(fields=['searchCity'],
+                         name='listing_search_city_idx'),
+            models.Index(fields=['idCountry'], name='listing_country_idx'),
+            models.Index(fields=['updated'], name='listing_updated_idx'),
+        ]
 
 
 class UserFavoriteRestaurant(TimeStampedModel):
@@ -87,6 +211,14 @@ class UserFavoriteRestaurant(TimeStampedModel):
     
     class Meta:
         db_table = 'UserFavoriteRestaurants'
+        indexes = [
+            models.Index(fields=['user', 'deleted', 'restaurant'],
+                         name='favorite_user_deleted_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'restaurant'],
+                                    name='favorite_user_restaurant_uniq'),
+        ]
 
 
 class UserBlocklistRestaurant(TimeStampedModel):
@@ -101,6 +233,14 @@ class UserBlocklistRestaurant(TimeStampedModel):
     
     class Meta:
         db_table = 'UserBlocklistRestaurants'
+        indexes = [
+            models.Index(fields=['user', 'deleted', 'restaurant'],
+                         name='blocklist_user_deleted_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'restaurant'],
+                                    name='blocklist_user_restaurant_uniq'),
+        ]
 
 
 
@@ -0,0 +1,182 @@
+# python
+from __future__ import unicode_literals
+import math
+import unicodedata
+# libs
+from django.db.models import (Case, Count, IntegerField, OuterRef, Q,
+                              Subquery, Value, When)
+from django.db.models.functions import Coalesce
+# local
+from .models import RestaurantTrigram
+
+
+# RestaurantTrigram.field
+NAME, CITY = 0, 1
+# searched field: (normalized column, trigram field)
+SEARCH_FIELDS = {'restaurantName': ('searchName', NAME),
+                 'city': ('searchCity', CITY)}
+INDEXED_LOOKUPS = ('icontains', 'istartswith', 'iendswith')
+# share of the q trigrams a restaurant needs to match
+MIN_SIMILARITY = 0.5
+
+
+def normalize(value):
+    """Lowercased, accent stripped value with single spaces, what the
+    search columns hold and the searched values are compared with.
+    """
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(value.casefold().split())
+
+
+def prefix_q(column, value):
+    """Filter of the rows whose normalized column starts with value, as a
+    range (column >= value AND column < successor) the column index can
+    serve, unlike LIKE 'value%'. The bounds end with a letter or a digit,
+    which every collation orders alike: trailing other characters are
+    dropped from the lower bound (a wider range) and the successor skips
+    them too, carrying over 'z' and '9' ('az' -> 'b').
+    """
+    prefix = value
+    while prefix and not (prefix[-1].isascii() and prefix[-1].isalnum()):
+        prefix = prefix[:-1]
+    if not prefix:
+        return Q()
+    lookup = Q(**{'%s__gte' % column: prefix})
+    upper = prefix
+    while upper and not (upper[-1].isascii() and upper[-1].isalnum() and
+                         upper[-1] not in 'z9'):
+        upper = upper[:-1]
+    if upper:
+        lookup &= Q(**{'%s__lt' % column:
+                       upper[:-1] + chr(ord(upper[-1]) + 1)})
+    return lookup
+
+
+def trigrams(value):
+    """Set of the 3 characters substrings of value."""
+    return set(value[i:i + 3] for i in range(len(value) - 2))
+
+
+def document_trigrams(value):
+    """Trigrams stored for a normalized value, padded with a space on both
+    sides so that word starts (' ab') and ends ('yz ') have their own.
+    Every substring of value has its trigrams in there.
+    """
+    return trigrams(' %s ' % value) if value else set()
+
+
+def search_values(name, city):
+    """searchName and searchCity of a restaurantName and city."""
+    return {'searchName': normalize(name)[:250],
+            'searchCity': normalize(city)[:50]}
+
+
+def sync_search_index(restaurants):
+    """Rebuilds the RestaurantTrigram rows of the restaurants.
+
+    :param restaurants: (idRestaurant, restaurantName, city) tuples
+    """
+    restaurants = list(restaurants)
+    if not restaurants:
+        return
+    RestaurantTrigram.objects.filter(
+        restaurant__in=[pk for pk, _, _ in restaurants]).delete()
+    rows = list()
+    for pk, name, city in restaurants:
+        values = search_values(name, city)
+        for field, value in ((NAME, values['searchName']),
+                             (CITY, values['searchCity'])):
+            rows.extend(RestaurantTrigram(restaurant_id=pk, field=field,
+                                          trigram=trigram)
+                        for trigram in document_trigrams(value))
+    RestaurantTrigram.objects.bulk_create(rows)
+
+
+def _matching(fields, grams, minimum):
+    """Subquery of the restaurants having at least minimum of the trigrams
+    grams in fields, an index only scan of restaurant_trigram_idx.
+    """
+    return RestaurantTrigram.objects.filter(
+        field__in=fields, trigram__in=sorted(grams)).order_by()\
+        .values('restaurant')\
+        .annotate(matches=Count('trigram', distinct=True))\
+        .filter(matches__gte=minimum).values('restaurant')
+
+
+def _matches(field, grams):
+    """Number of the trigrams grams of the restaurant field."""
+    return Coalesce(Subquery(
+        RestaurantTrigram.objects.filter(
+            restaurant=OuterRef('pk'), field=field,
+            trigram__in=sorted(grams)).order_by().values('restaurant')
+        .annotate(matches=Count('pk')).values('matches'),
+        output_field=IntegerField()), 0)
+
+
+def indexed_lookups(kw):
+    """Splits the search kwargs of the controller into the ones applied as
+    they are and the Q objects serving the restaurantName and city
+    icontains, istartswith and iendswith lookups from the search columns:
+    prefixes are an index range of the normalized column, substrings and
+    suffixes need all their trigrams before comparing it. Those only
+    narrow the rows down, the lookup itself is still applied to them so
+    that the raw value (eg. its spaces) keeps its meaning.
+
+    :param kw: queryset kwargs, see ControllerBase.parse_search_params
+    :type kw: dict
+    """
+    rest, lookups = dict(), list()
+    for key, value in kw.items():
+        field, _, op = key.partition('__')
+        if field not in SEARCH_FIELDS or op not in INDEXED_LOOKUPS or \
+                not isinstance(value, str):
+            rest[key] = value
+            continue
+        column, trigram_field = SEARCH_FIELDS[field]
+        normalized = normalize(value)
+        if op == 'istartswith':
+            lookups.append(prefix_q(column, normalized) & Q(**{key: value}))
+            continue
+        lookup = Q(**{'%s__%s' % (column, op[1:]): normalized}) & \
+            Q(**{key: value})
+        grams = trigrams(normalized + ' ' if op == 'iendswith'
+                         else normalized)
+        if grams:
+            lookup &= Q(idRestaurant__in=_matching(
+                [trigram_field], grams, len(grams)))
+        lookups.append(lookup)
+    return rest, lookups
+
+
+def relevance_search(q):
+    """Filter and relevance expression of the free text search q over the
+    restaurant names and cities. Restaurants match when they have
+    MIN_SIMILARITY of the trigrams of q, so typos are forgiven. Name
+    trigrams weigh twice city ones, names equal to or starting with q come
+    first.
+
+    :param q: searched text
+    :type q: str
+    :returns: (Q, expression)
+    """
+    value = normalize(q)
+    # word start trigrams, ' a' alone is too short to have any
+    grams = trigrams(' ' + value)
+    if not grams:
+        where = Q(searchName__startswith=value) | \
+            Q(searchName__contains=' ' + value) | \
+            Q(searchCity__startswith=value)
+        relevance = Case(When(searchName__startswith=value, then=Value(2)),
+                         When(searchCity__startswith=value, then=Value(1)),
+                         default=Value(0), output_field=IntegerField())
+        return where, relevance
+
+    count = len(grams)
+    minimum = max(1, int(math.ceil(count * MIN_SIMILARITY)))
+    where = Q(idRestaurant__in=_matching([NAME, CITY], grams, minimum))
+    relevance = _matches(NAME, grams) * 2 + _matches(CITY, grams) + Case(
+        When(searchName=value, then=Value(count * 4)),
+        When(searchName__startswith=value, then=Value(count * 2)),
+        default=Value(0), output_field=IntegerField())
+    return where, relevance
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import threading
+import time
 
-from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from . import models
 
 
@@ -14,8 +19,48 @@ class CountrySerializer(serializers.ModelSerializer):
         read_only_fields = ('created', 'updated')
 
 
+class CountryTable(object):
+    """Process wide lookup table of serialized countries by idCountry.
+
+    Country is a small, rarely changing table: it is loaded and serialized
+    once, then reused by every nested country representation. Reloaded after
+    settings.COUNTRY_TABLE_TTL seconds, on a miss, or when cleared by the
+    Country signals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table = None
+        self._loaded = 0
+
+    def load(self):
+        table = dict((country['idCountry'], country) for country in
+                     CountrySerializer(models.Country.objects.all(),
+                                       many=True).data)
+        with self._lock:
+            self._table = table
+            self._loaded = time.monotonic()
+        return table
+
+    def clear(self):
+        with self._lock:
+            self._table = None
+
+    def get(self, pk):
+        table = self._table
+        if table is None or time.monotonic() - self._loaded > \
+                getattr(settings, 'COUNTRY_TABLE_TTL', 3600):
+            table = self.load()
+        if pk not in table:
+            table = self.load()
+        return table.get(pk)
+
+
+country_table = CountryTable()
+
+
 class RestaurantSerializer(serializers.ModelSerializer):
-    country = CountrySerializer(read_only=True)
+    country = serializers.SerializerMethodField()
     distance = serializers.SerializerMethodField()
     status = serializers.SerializerMethodField()
     
@@ -28,8 +73,117 @@ class RestaurantSerializer(serializers.ModelSerializer):
         read_only_fields = ('country', 'distance', 'status', 'created', 
                             'updated')
 
+    def get_country(self, obj):
+        # nested CountrySerializer output, served from the country table
+        return country_table.get(obj.country_id)
+
     def get_distance(self, obj):
         return obj.distance
     
     def get_status(self, obj):
-        return obj.status
\ No newline at end of file
+        return obj.status
+
+
+# columns RestaurantCollection fetches with .values() for the fast path
+RESTAURANT_VALUES = ('idRestaurant', 'country_id', 'restaurantName',
+                     'address1', 'address2', 'address3', 'city', 'postcode',
+                     'phones', 'email', 'website', 'vatNumber', 'currency',
+                     'created', 'updated', 'latitude', 'longitude',
+                     'openingTime', 'closingTime', 'is_favorite')
+
+
+def _datetime_representation():
+    """Returns a function rendering datetimes like DRF DateTimeField."""
+    output_format = api_settings.DATETIME_FORMAT
+    field_timezone = timezone.get_current_timezone() if settings.USE_TZ \
+        else None
+
+    def representation(value):
+        if not value:
+            return None
+        if output_format is None or isinstance(value, str):
+            return value
+        if field_timezone is not None:
+            if timezone.is_aware(value):
+                value = value.astimezone(field_timezone)
+            else:
+                value = timezone.make_aware(value, field_timezone)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, timezone.utc)
+        if output_format.lower() == ISO_8601:
+            value = value.isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return value.strftime(output_format)
+    return representation
+
+
+def _values_data(rows, status_distances, country, to_datetime):
+    """Items of the fast path serializers, country(row) returns the nested
+    country of a row.
+    """
+    # character columns come back from the database as str (or None), which
+    # is what DRF CharField renders them as
+    return [{'idRestaurant': row['idRestaurant'],
+             'country': country(row),
+             'restaurantName': row['restaurantName'],
+             'address1': row['address1'],
+             'address2': row['address2'],
+             'address3': row['address3'],
+             'city': row['city'],
+             'postcode': row['postcode'],
+             'phones': row['phones'],
+             'email': row['email'],
+             'website': row['website'],
+             'vatNumber': row['vatNumber'],
+             'currency': row['currency'],
+             'distance': distance,
+             'status': status,
+             'created': to_datetime(row['created']),
+             'updated': to_datetime(row['updated'])}
+            for row, (distance, status) in zip(rows, status_distances)]
+
+
+def restaurant_values_data(rows, status_distances):
+    """Fast path of RestaurantSerializer(many=True).data for the list
+    endpoint, builds the same items straight from .values(*RESTAURANT_VALUES)
+    rows without DRF field resolution. status_distances holds the
+    [distance, status] pair of each row.
+    """
+    return _values_data(rows, status_distances,
+                        lambda row: country_table.get(row['country_id']),
+                        _datetime_representation())
+
+
+# columns RestaurantCollection fetches from RestaurantListing
+LISTING_VALUES = ('idRestaurant', 'idCountry', 'countryA2Code',
+                  'countryA3Code', 'countryName', 'countryPhonePrefix',
+                  'countryIdFlag', 'countryCreated', 'countryUpdated',
+                  'restaurantName', 'address1', 'address2', 'address3',
+                  'city', 'postcode', 'phones', 'email', 'website',
+                  'vatNumber', 'currency', 'created', 'updated', 'latitude',
+                  'longitude', 'openingTime', 'closingTime', 'is_favorite')
+
+
+def listing_values_data(rows, status_distances):
+    """restaurant_values_data of .values(*LISTING_VALUES) rows, the nested
+    country comes from the inlined columns instead of the country table.
+    """
+    to_datetime = _datetime_representation()
+    countries = dict()
+
+    def country(row):
+        pk = row['idCountry']
+        if pk not in countries:
+            countries[pk] = {'idCountry': pk,
+                             'a2Code': row['countryA2Code'],
+                             'a3Code': row['countryA3Code'],
+                             'countryName': row['countryName'],
+                             'phonePrefix': row['countryPhonePrefix'],
+                             'idFlag': row['countryIdFlag'],
+                             'created': to_datetime(row['countryCreated']),
+                             'updated': to_datetime(row['countryUpdated'])}
+        return countries[pk]
+
+    return _values_data(rows, status_distances, country, to_datetime)
@@ -0,0 +1,109 @@
+# python
+from __future__ import unicode_literals
+# libs
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+# local
+from utils.routers import stick_to_primary
+from .cache import (bump_catalogue_version, invalidate_on_commit,
+                    invalidate_user_restaurants)
+from .hours import previous_hours, sync_opening_hours
+from .listing import sync_country, sync_listing
+from .models import (Country, Restaurant, RestaurantListing,
+                     UserFavoriteRestaurant, UserBlocklistRestaurant)
+from .search import search_values, sync_search_index
+from .serializers import country_table
+from .spatial import get_restaurant_index
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_deleted(sender, instance, **kwargs):
+    # hard deletes leave no timestamp behind for the incremental refresh
+    index = get_restaurant_index()
+    if index is not None:
+        index.discard(instance.pk)
+
+
+def hours_saved(update_fields):
+    return update_fields is None or \
+        bool({'openingTime', 'closingTime'} & set(update_fields))
+
+
+@receiver(pre_save, sender=Restaurant)
+def restaurant_hours(sender, instance, update_fields=None, **kwargs):
+    # the stored times, saves keeping them keep the OpeningHours rows
+    instance._previous_hours = previous_hours([instance.pk]) \
+        if instance.pk is not None and hours_saved(update_fields) else {}
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance, update_fields=None, **kwargs):
+    if not hours_saved(update_fields):
+        return
+    # the times are still strings when the instance was built from them
+    to_python = sender._meta.get_field('openingTime').to_python
+    sync_opening_hours([(instance.pk, to_python(instance.openingTime),
+                         to_python(instance.closingTime))],
+                       previous=getattr(instance, '_previous_hours', None))
+
+
+@receiver(pre_save, sender=Restaurant)
+def restaurant_search_values(sender, instance, **kwargs):
+    for name, value in search_values(instance.restaurantName,
+                                     instance.city).items():
+        setattr(instance, name, value)
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_search_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None:
+        if not {'restaurantName', 'city'} & set(update_fields):
+            return
+        if not {'searchName', 'searchCity'} <= set(update_fields):
+            sender.objects.filter(pk=instance.pk).update(
+                searchName=instance.searchName,
+                searchCity=instance.searchCity)
+    sync_search_index([(instance.pk, instance.restaurantName,
+                        instance.city)])
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_listing_saved(sender, instance, **kwargs):
+    # registered after restaurant_search_saved, the row is rebuilt from
+    # the saved columns
+    sync_listing([instance.pk])
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_listing_deleted(sender, instance, **kwargs):
+    RestaurantListing.objects.filter(idRestaurant=instance.pk).delete()
+
+
+@receiver(post_save, sender=Country)
+def country_listing_saved(sender, instance, **kwargs):
+    sync_country(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+def catalogue_changed(sender, instance, **kwargs):
+    invalidate_on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+def country_changed(sender, instance, **kwargs):
+    invalidate_on_commit(country_table.clear)
+
+
+@receiver(post_save, sender=UserFavoriteRestaurant)
+@receiver(post_delete, sender=UserFavoriteRestaurant)
+@receiver(post_save, sender=UserBlocklistRestaurant)
+@receiver(post_delete, sender=UserBlocklistRestaurant)
+def user_restaurants_changed(sender, instance, **kwargs):
+    # soft deletes go through save(), queryset.update() callers have to
+    # invalidate the user lists themselves
+    invalidate_on_commit(invalidate_user_restaurants, instance.user_id)
+    stick_to_primary('user:%s' % instance.user_id)
@@ -0,0 +1,217 @@
+# python
+from __future__ import unicode_literals
+from array import array
+from collections import defaultdict
+from math import floor, pi, radians
+import threading
+import time
+# libs
+from django.conf import settings
+from django.db.models import Max, Q
+# local
+from utils.geo import EARTH_RADIUS_MILES, bounding_box, haversine
+from .models import Restaurant
+
+
+class RestaurantGridIndex(object):
+    """In-process spatial index of the active restaurants.
+
+    Coordinates are kept in packed float arrays and bucketed in a uniform
+    lat/long grid of `cell_size` degrees, so radius and nearest queries only
+    compute distances for the restaurants of the cells around the user.
+    The index is loaded on first use and then refreshed incrementally from
+    `Restaurant.updated`/`deleted` every `refresh_interval` seconds.
+    """
+
+    def __init__(self, cell_size=0.25, refresh_interval=30):
+        self.cell_size = cell_size
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._ids = array('l')
+        self._lats = array('d')
+        self._lons = array('d')
+        self._positions = dict()
+        self._free = list()
+        self._cells = defaultdict(set)
+        self._synced = None
+        self._checked = 0
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, latitude, longitude):
+        return (int(floor(latitude / self.cell_size)),
+                int(floor(longitude / self.cell_size)))
+
+    def _add(self, pk, latitude, longitude):
+        self._discard(pk)
+        latitude, longitude = float(latitude), float(longitude)
+        if self._free:
+            pos = self._free.pop()
+            self._ids[pos] = pk
+            self._lats[pos] = latitude
+            self._lons[pos] = longitude
+        else:
+            pos = len(self._ids)
+            self._ids.append(pk)
+            self._lats.append(latitude)
+            self._lons.append(longitude)
+        self._positions[pk] = pos
+        self._cells[self._cell(latitude, longitude)].add(pos)
+
+    def _discard(self, pk):
+        pos = self._positions.pop(pk, None)
+        if pos is None:
+            return
+        cell = self._cell(self._lats[pos], self._lons[pos])
+        self._cells[cell].discard(pos)
+        if not self._cells[cell]:
+            del self._cells[cell]
+        self._ids[pos] = 0
+        self._free.append(pos)
+
+    def _sync_mark(self, *timestamps):
+        for value in timestamps:
+            if value is not None and (self._synced is None or
+                                      value > self._synced):
+                self._synced = value
+
+    def load(self):
+        """(Re)loads every active restaurant."""
+        with self._lock:
+            self._reset()
+            rows = Restaurant.objects.filter(deleted__isnull=True)\
+                .order_by().values_list('idRestaurant', 'latitude',
+                                        'longitude')
+            for pk, latitude, longitude in rows.iterator():
+                self._add(pk, latitude, longitude)
+            self._sync_mark(*Restaurant.objects.order_by().aggregate(
+                Max('updated'), Max('deleted')).values())
+            self._loaded = True
+            self._checked = time.monotonic()
+
+    def refresh(self):
+        """Applies the restaurants created, updated or deleted since the last
+        load/refresh.
+        """
+        with self._lock:
+            if self._synced is None:
+                return self.load()
+            changed = Restaurant.objects.filter(
+                Q(updated__gte=self._synced) | Q(deleted__gte=self._synced))\
+                .order_by().values_list('idRestaurant', 'latitude',
+                                        'longitude', 'updated', 'deleted')
+            for pk, latitude, longitude, updated, deleted in changed:
+                if deleted is None:
+                    self._add(pk, latitude, longitude)
+                else:
+                    self._discard(pk)
+                self._sync_mark(updated, deleted)
+            self._checked = time.monotonic()
+
+    def discard(self, pk):
+        with self._lock:
+            self._discard(pk)
+
+    def ensure_fresh(self):
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._checked >= self.refresh_interval:
+            self.refresh()
+
+    def within(self, latitude, longitude, radius):
+        """Returns {idRestaurant: distance} of the restaurants within radius
+        (miles) of the given point.
+        """
+        self.ensure_fresh()
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude,
+                                                          longitude, radius)
+        if min_lon is None:
+            min_lon, max_lon = -180.0, 180.0
+        lat_cells = range(self._cell(min_lat, 0)[0],
+                          self._cell(max_lat, 0)[0] + 1)
+        if min_lon <= max_lon:
+            lon_cells = range(self._cell(0, min_lon)[1],
+                              self._cell(0, max_lon)[1] + 1)
+        else:  # crosses the antimeridian
+            lon_cells = set(range(self._cell(0, min_lon)[1],
+                                  self._cell(0, 180.0)[1] + 1)) | \
+                set(range(self._cell(0, -180.0)[1],
+                          self._cell(0, max_lon)[1] + 1))
+
+        found = dict()
+        with self._lock:
+            ids, lats, lons, cells = (self._ids, self._lats, self._lons,
+                                      self._cells)
+            if len(lat_cells) * len(lon_cells) > len(cells):
+                keys = (cell for cell in cells
+                        if cell[0] in lat_cells and cell[1] in lon_cells)
+            else:
+                keys = ((i, j) for i in lat_cells for j in lon_cells)
+            for key in keys:
+                for pos in cells.get(key, ()):
+                    distance = haversine(latitude, longitude, lats[pos],
+                                         lons[pos])
+                    if distance <= radius:
+                        found[ids[pos]] = distance
+        return found
+
+    def nearest(self, latitude, longitude, count):
+        """Returns up to `count` (distance, idRestaurant) pairs, nearest
+        first. The search radius starts around one grid cell and grows
+        until enough restaurants are found.
+        """
+        self.ensure_fresh()
+        count = min(count, len(self))
+        radius = radians(self.cell_size) * EARTH_RADIUS_MILES
+        found = dict()
+        while count:
+            found = self.within(latitude, longitude, radius)
+            if len(found) >= count or radius >= pi * EARTH_RADIUS_MILES:
+                break
+            radius *= 4
+        return sorted((d, pk) for pk, d in found.items())[:count]
+
+    def distance(self, latitude, longitude, pk):
+        """Distance (miles) to the restaurant pk, None when it is not in
+        the index.
+        """
+        self.ensure_fresh()
+        pos = self._positions.get(pk)
+        if pos is None:
+            return None
+        return haversine(latitude, longitude, self._lats[pos],
+                         self._lons[pos])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_restaurant_index():
+    """Returns the process wide RestaurantGridIndex, or None when
+    settings.RESTAURANT_SPATIAL_INDEX is off.
+    """
+    global _index
+    if not getattr(settings, 'RESTAURANT_SPATIAL_INDEX', False):
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = RestaurantGridIndex(
+                    cell_size=getattr(settings,
+                                      'RESTAURANT_SPATIAL_INDEX_CELL_SIZE',
+                                      0.25),
+                    refresh_interval=getattr(
+                        settings, 'RESTAURANT_SPATIAL_INDEX_REFRESH', 30))
+    return _index
+
+
+def reset_restaurant_index():
+    global _index
+    with _index_lock:
+        _index = None
@@ -1,3 +1,1123 @@
-from django.test import TestCase
+import csv
+from datetime import datetime, time
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import (OperationalError, close_old_connections,
+                       connection, connections, transaction)
+from django.http import QueryDict
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant_choices.asgi import application
+from utils.controllers import parse_search
+from utils.db_pool import ConnectionPool, PoolTimeout
+from utils.routers import (ReplicaUnavailable, healthy_replicas,
+                           mark_healthy, mark_unhealthy, replica_reads,
+                           sticky_cache)
+from utils.schemas import reset_api_schema
+from utils.startup import prewarm
+from utils.throttling import UserSlidingWindowThrottle
+from .models import (Country, OpeningHours, Restaurant, RestaurantListing,
+                     UserFavoriteRestaurant, UserBlocklistRestaurant)
+from .cache import (USER_RESTAURANTS_KEY, catalogue_version,
+                    get_user_restaurants)
+from .hours import opening_ranges
+from .listing import refresh_listing
+from .search import indexed_lookups, normalize
+from .controllers.restaurant import RestaurantListController
+from .serializers import CountrySerializer, country_table
+from .spatial import get_restaurant_index, reset_restaurant_index
+from .views.user import UserRestaurantList
+from .views.restaurant import (RestaurantCollection, batch_status_distance,
+                               seconds_to_status_change, status_distance)
+
+
+class RestaurantTestData(object):
+    """Small catalogue around Aberdeen shared by the restaurant tests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = Country.objects.create(idCountry=826, a2Code='GB',
+                                             a3Code='GBR',
+                                             countryName='United Kingdom',
+                                             phonePrefix=44)
+        cls.restaurants = [
+            Restaurant.objects.create(
+                country=cls.country, restaurantName='Restaurant %02d' % i,
+                address1='%d Union Street' % i,
+                city='Aberdeen' if i % 2 else 'Edinburgh',
+                postcode='AB%d 1XZ' % i, phones={'mobile': '0%d' % i},
+                openingTime=time(9), closingTime=time(2 if i % 3 else 22),
+                latitude='57.%06d' % (i * 10000),
+                longitude='-2.%06d' % (i * 10000))
+            for i in range(20)]
+        cls.user = User.objects.create(username='user')
+        UserFavoriteRestaurant.objects.create(user=cls.user,
+                                              restaurant=cls.restaurants[5])
+        UserBlocklistRestaurant.objects.create(user=cls.user,
+                                               restaurant=cls.restaurants[6])
+
+    def setUp(self):
+        super(RestaurantTestData, self).setUp()
+        cache.clear()
+        sticky_cache().clear()
+        country_table.clear()
+        # tests issue more requests per second than the throttle allows
+        for view in (RestaurantCollection, UserRestaurantList):
+            patcher = mock.patch.object(view, 'throttle_classes', ())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_restaurants(self, **params):
+        params.setdefault('userId', self.user.pk)
+        params.setdefault('latitude', '57.149453')
+        params.setdefault('longitude', '-2.172841')
+        return self.client.get(reverse('services:restaurant_collection'),
+                               params)
+
+
+class SearchParamsTest(TestCase):
+
+    def cleaned_data(self, query_string):
+        controller = RestaurantListController(data=QueryDict(query_string),
+                                              request=mock.Mock())
+        controller.validate_search()
+        controller.validate_exclude()
+        return controller.cleaned_data
+
+    def test_search_and_exclude(self):
+        data = self.cleaned_data(
+            'city=Aberdeen&idRestaurant__range=(1,5)&postcode__isnull=false'
+            '&restaurantName__in=[A, B]&city__exact=x&userId=1'
+            '&idRestaurant__range=1,2,3&exclude__city__in=Leeds,York'
+            '&exclude__postcode__gt=1')
+        self.assertEqual(data['search'], {'city': 'Aberdeen',
+                                          'postcode__isnull': False,
+                                          'restaurantName__in': ('A', 'B')})
+        self.assertEqual(data['exclude'], {'city__in': ('Leeds', 'York')})
+
+    def test_non_string_values(self):
+        for data, key, error in (
+                ({'city__icontains': ['Ab']}, 'search',
+                 'invalid city__icontains'),
+                ({'city': 1}, 'search', 'invalid city'),
+                ({'exclude__postcode__isnull': ['true']}, 'exclude',
+                 'invalid postcode__isnull'),
+                ({'idRestaurant__in': [[1, 2]]}, 'search',
+                 'invalid idRestaurant__in')):
+            controller = RestaurantListController(data=data,
+                                                  request=mock.Mock())
+            self.assertFalse(controller.is_valid())
+            self.assertEqual(controller.errors[key], error)
+
+    def test_parsed_query_strings_are_cached(self):
+        parse_search.cache_clear()
+        for _ in range(3):
+            self.cleaned_data('city__istartswith=Ab')
+        self.assertEqual(parse_search.cache_info().hits, 4)
+
+
+class RestaurantIndexTest(RestaurantTestData, TestCase):
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN %s' % sql)
+                return ' '.join(str(row[-1]) for row in cursor.fetchall())
+            cursor.execute('EXPLAIN %s' % sql)
+            columns = [column[0] for column in cursor.description]
+            return ' '.join(str(dict(zip(columns, row)).get('key'))
+                            for row in cursor.fetchall())
+
+    def assertQueriesUseIndexes(self, params, indexes):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_restaurants(**params)
+        self.assertEqual(response.status_code, 200)
+        plans = ' '.join(self.query_plan(query['sql'])
+                         for query in queries.captured_queries
+                         if query['sql'].startswith('SELECT'))
+        for names in indexes:
+            self.assertTrue(any(name in plans for name in names),
+                            '%s not used in %s' % (names, plans))
+
+    def test_user_lists_use_index(self):
+        # sqlite backs unique constraints with its own autoindex
+        self.assertQueriesUseIndexes({}, [
+            ('favorite_user_deleted_idx', 'favorite_user_restaurant_uniq',
+             'sqlite_autoindex_UserFavoriteRestaurants'),
+            ('blocklist_user_deleted_idx', 'blocklist_user_restaurant_uniq',
+             'sqlite_autoindex_UserBlocklistRestaurants'),
+        ])
+
+    def test_city_search_uses_index(self):
+        self.assertQueriesUseIndexes({'city': 'Aberdeen'}, [
+            ('restaurant_deleted_city_idx',),
+        ])
+
+    def test_name_search_uses_trigram_index(self):
+        self.assertQueriesUseIndexes({'restaurantName__icontains': 'ant 1'}, [
+            ('restaurant_trigram_idx',),
+        ])
+
+    def test_radius_search_uses_index(self):
+        self.assertQueriesUseIndexes({'radius': 5}, [
+            ('restaurant_deleted_geo_idx',),
+        ])
+
+    def test_open_at_uses_index(self):
+        self.assertQueriesUseIndexes({'open_at': '23:00'}, [
+            ('opening_hours_lookup_idx',),
+        ])
+
+class RestaurantQueryCountTest(RestaurantTestData, TestCase):
+
+    def count_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_restaurants(**params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    # the first bounding box of order=distance holds the whole catalogue,
+    # and pages of 2 don't fit in the favorites
+    @override_settings(RESTAURANT_NEAREST_INITIAL_RADIUS=50)
+    def test_constant_queries_per_page_size(self):
+        self.get_restaurants()  # warm up user and country caches
+        for params in ({}, {'radius': 50}, {'order': 'distance'}):
+            self.assertEqual(self.count_queries(limit=2, **params),
+                             self.count_queries(limit=20, **params))
+
+    def test_country_is_nested(self):
+        content = self.get_restaurants(limit=1).json()['content']
+        self.assertEqual(content['favoriteRestaurants'][0]['country'],
+                         CountrySerializer(self.country).data)
+        self.country.countryName = 'Scotland'
+        self.country.save()
+        content = self.get_restaurants(limit=1).json()['content']
+        self.assertEqual(content['favoriteRestaurants'][0]['country']['countryName'],
+                         'Scotland')
+
+
+class CursorPaginationTest(RestaurantTestData, TestCase):
+
+    def ids(self, content):
+        return [r['idRestaurant'] for r in content['favoriteRestaurants'] +
+                content['restaurants']]
+
+    def test_cursor_pages_match_offset_pages(self):
+        Restaurant.objects.filter(pk__in=[self.restaurants[3].pk,
+                                          self.restaurants[8].pk])\
+            .update(postcode=None, restaurantName='Same name')
+        for order in ('idRestaurant', '-idRestaurant', 'restaurantName',
+                      '-restaurantName', 'postcode', '-postcode', 'city',
+                      'distance', '-distance'):
+            params = {'order': order, 'limit': 3}
+            if order.endswith('distance'):
+                params['radius'] = 50
+            expected = self.ids(self.get_restaurants(
+                **dict(params, limit=100)).json()['content'])
+            seen, cursor = [], ''
+            while cursor is not None:
+                body = self.get_restaurants(cursor=cursor, **params).json()
+                seen += self.ids(body['content'])
+                cursor = body['_metadata']['nextCursor']
+            self.assertEqual(seen, expected, order)
+
+    def test_radius_cursor_reads_candidates_only(self):
+        first = self.get_restaurants(cursor='', limit=2, radius=10,
+                                     order='city').json()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_restaurants(cursor=first['_metadata']['nextCursor'],
+                                 limit=2, radius=10, order='city')
+        after = [query['sql'] for query in queries
+                 if '"City" >' in query['sql']]
+        self.assertEqual(len(after), 1)
+        self.assertIn('"idRestaurant" IN (', after[0].split('WHERE')[1])
+
+    def test_invalid_cursor(self):
+        first = self.get_restaurants(cursor='', limit=2).json()
+        cursor = first['_metadata']['nextCursor']
+        for params in ({'cursor': 'not-a-cursor'},
+                       {'cursor': cursor, 'order': 'city'}):
+            response = self.get_restaurants(**params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['errors'],
+                             {'cursor': 'invalid cursor'})
+
+
+class NearestRestaurantsTest(RestaurantTestData, TestCase):
+
+    def ids(self, content):
+        return [r['idRestaurant'] for r in content['favoriteRestaurants'] +
+                content['restaurants']]
+
+    @override_settings(RESTAURANT_NEAREST_INITIAL_RADIUS=1)
+    def test_growing_radius_matches_full_scan(self):
+        for params in ({'limit': 3}, {'limit': 4, 'page': 2},
+                       {'limit': 50}, {'limit': 2, 'city': 'Aberdeen'}):
+            content = self.get_restaurants(order='distance', **params).json()
+            expected = self.get_restaurants(order='distance', radius=500,
+                                            **params).json()
+            self.assertEqual(content['content'], expected['content'])
+            self.assertEqual(content['_metadata']['totalRecords'],
+                             expected['_metadata']['totalRecords'])
+
+        expected = self.ids(self.get_restaurants(
+            order='distance', limit=100).json()['content'])
+        seen, cursor = [], ''
+        while cursor is not None:
+            body = self.get_restaurants(order='distance', limit=3,
+                                        cursor=cursor).json()
+            seen += self.ids(body['content'])
+            cursor = body['_metadata']['nextCursor']
+        self.assertEqual(seen, expected)
+
+    def test_reads_only_nearby_rows(self):
+        far = Restaurant.objects.create(
+            country=self.country, restaurantName='Far', address1='x',
+            city='Leeds', openingTime=time(9), closingTime=time(22),
+            latitude='53.800000', longitude='-1.500000')
+        with CaptureQueriesContext(connection) as queries:
+            content = self.get_restaurants(order='distance', limit=2).json()
+        self.assertEqual(content['_metadata']['totalRecords'], 20)
+        self.assertNotIn(far.pk, self.ids(content['content']))
+        self.assertTrue([query for query in queries
+                         if 'BETWEEN' in query['sql']])
+
+    def test_farthest_first_needs_radius(self):
+        response = self.get_restaurants(order='-distance')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'],
+                         {'radius': 'radius required by -distance'})
+
+
+class UserRestaurantsCacheTest(RestaurantTestData, TestCase):
+
+    def test_cached_until_lists_change(self):
+        favorite = self.restaurants[5].pk
+        self.assertEqual(get_user_restaurants(self.user.pk)[:2],
+                         (frozenset([favorite]),
+                          frozenset([self.restaurants[6].pk])))
+        with self.assertNumQueries(0):
+            get_user_restaurants(self.user.pk)
+
+        UserFavoriteRestaurant.objects.create(user=self.user,
+                                              restaurant=self.restaurants[7])
+        self.assertEqual(get_user_restaurants(self.user.pk)[0],
+                         frozenset([favorite, self.restaurants[7].pk]))
+
+        blocked = UserBlocklistRestaurant.objects.get(user=self.user)
+        blocked.deleted = timezone.now()
+        blocked.save()
+        self.assertEqual(get_user_restaurants(self.user.pk)[1], frozenset())
+
+    def test_invalidated_again_on_commit(self):
+        with transaction.atomic():
+            UserFavoriteRestaurant.objects.create(
+                user=self.user, restaurant=self.restaurants[7])
+            # a concurrent request caching the rows before the commit
+            cache.set(USER_RESTAURANTS_KEY % self.user.pk, 'stale')
+            version = catalogue_version()
+            self.restaurants[7].save()
+            for _, callback in connection.run_on_commit:
+                callback()
+        self.assertIsNone(cache.get(USER_RESTAURANTS_KEY % self.user.pk))
+        self.assertGreater(catalogue_version(), version + 1)
+
+    def test_blocked_favorite_is_listed(self):
+        UserBlocklistRestaurant.objects.create(user=self.user,
+                                               restaurant=self.restaurants[5])
+        content = self.get_restaurants().json()['content']
+        self.assertEqual([r['idRestaurant']
+                          for r in content['favoriteRestaurants']],
+                         [self.restaurants[5].pk])
+        self.assertNotIn(self.restaurants[6].pk,
+                         [r['idRestaurant'] for r in content['restaurants']])
+
+
+class UserRestaurantListTest(RestaurantTestData, TestCase):
+
+    def setUp(self):
+        super(UserRestaurantListTest, self).setUp()
+        self.client.force_login(self.user)
+
+    def change(self, method, restaurants, name='favorites', user_id=None):
+        url = reverse('services:user_%s' % name,
+                      args=[user_id or self.user.pk])
+        if method == 'get':
+            return self.client.get(url)
+        return getattr(self.client, method)(
+            url, json.dumps(restaurants), content_type='application/json')
+
+    def test_bulk_add_and_remove(self):
+        ids = [r.pk for r in self.restaurants[4:8]]
+        get_user_restaurants(self.user.pk)
+        response = self.change('post', {'restaurants': ids + ids[:1]})
+        self.assertEqual(response.json()['content'],
+                         {'created': 3, 'restored': 0, 'unchanged': 1})
+        self.assertEqual(get_user_restaurants(self.user.pk).favorites,
+                         frozenset(ids))
+
+        response = self.change('delete', ids[:2] + [self.restaurants[9].pk])
+        self.assertEqual(response.json()['content'], {'deleted': 2})
+        self.assertEqual(get_user_restaurants(self.user.pk).favorites,
+                         frozenset(ids[2:]))
+
+        # removed entries are restored instead of duplicated
+        response = self.change('post', ids)
+        self.assertEqual(response.json()['content'],
+                         {'created': 0, 'restored': 2, 'unchanged': 2})
+        self.assertEqual(UserFavoriteRestaurant.objects.filter(
+            user=self.user).count(), 4)
+        self.assertEqual(len(self.get_restaurants(limit=20).json()
+                             ['content']['favoriteRestaurants']), 4)
+
+    def test_blocklist_and_errors(self):
+        self.change('post', [self.restaurants[8].pk], name='blocklist')
+        self.assertEqual(get_user_restaurants(self.user.pk).blocklist,
+                         frozenset([self.restaurants[6].pk,
+                                    self.restaurants[8].pk]))
+        for body in ([], ['a'], [0], [10 ** 9], {'restaurants': 1}):
+            self.assertEqual(self.change('post', body).status_code, 400)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.change('post', [1], user_id=10 ** 6)
+                         .status_code, 404)
+
+    def test_only_own_lists(self):
+        other = User.objects.create(username='other')
+        favorite = self.restaurants[5].pk
+        for method in ('get', 'post', 'delete'):
+            self.assertEqual(self.change(method, [favorite],
+                                         user_id=other.pk).status_code, 403)
+        self.client.logout()
+        for method in ('get', 'post', 'delete'):
+            self.assertEqual(self.change(method, [favorite]).status_code,
+                             403)
+        self.assertEqual(get_user_restaurants(self.user.pk).favorites,
+                         frozenset([favorite]))
+
+
+@override_settings(RESTAURANT_RESPONSE_CACHE=True)
+class ResponseCacheTest(RestaurantTestData, TestCase):
+
+    def test_hit_until_invalidated(self):
+        first = self.get_restaurants(city='Aberdeen')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.get_restaurants(city='Aberdeen',
+                                          latitude='57.14947')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(self.get_restaurants(city='Aberdeen', page=1)
+                         ['X-Cache'], 'MISS')
+
+        UserFavoriteRestaurant.objects.create(user=self.user,
+                                              restaurant=self.restaurants[1])
+        self.assertEqual(self.get_restaurants(city='Aberdeen')['X-Cache'],
+                         'MISS')
+        self.restaurants[3].restaurantName = 'Renamed'
+        self.restaurants[3].save()
+        response = self.get_restaurants(city='Aberdeen')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('Renamed', response.content.decode())
+
+        url = reverse('services:restaurant_cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create(username='staff',
+                                                    is_staff=True))
+        self.assertEqual(self.client.get(url).json(),
+                         {'hits': 1, 'misses': 4, 'hitRatio': 0.2})
+
+    def test_version_shared_by_the_workers(self):
+        self.get_restaurants(city='Aberdeen')
+        # a save in another worker, its own default cache
+        version = catalogue_version()
+        with mock.patch('services.cache.cache', caches['default'].__class__(
+                'other', {})):
+            self.restaurants[3].save()
+        self.assertEqual(catalogue_version(), version + 1)
+        self.assertEqual(self.get_restaurants(city='Aberdeen')['X-Cache'],
+                         'MISS')
+
+    def test_ttl_bounded_by_opening_hours(self):
+        objs = [Restaurant(openingTime=time(9), closingTime=time(22))]
+        self.assertEqual(seconds_to_status_change(objs, time(21, 59, 30)), 30)
+        self.assertEqual(seconds_to_status_change(objs, time(22, 0)), 1)
+        self.assertEqual(seconds_to_status_change(objs, time(23)), 10 * 3600)
+
+
+@override_settings(RESTAURANT_SPATIAL_INDEX=True,
+                   RESTAURANT_SPATIAL_INDEX_CELL_SIZE=0.05)
+class RestaurantSpatialIndexTest(RestaurantTestData, TestCase):
+
+    def setUp(self):
+        super(RestaurantSpatialIndexTest, self).setUp()
+        reset_restaurant_index()
+        self.addCleanup(reset_restaurant_index)
+
+    def content(self, **params):
+        response = self.get_restaurants(**params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_matches_sql_path(self):
+        for params in ({'radius': 10}, {'radius': 30, 'order': 'distance'},
+                       {'order': 'distance', 'limit': 3, 'page': 2},
+                       {'order': 'distance', 'city': 'Aberdeen'}):
+            indexed = self.content(**params)
+            with self.settings(RESTAURANT_SPATIAL_INDEX=False):
+                self.assertEqual(indexed, self.content(**params))
+
+    def test_favorites_on_first_request(self):
+        # favorites further by pk are nearer, the index is not loaded yet
+        for i in (2, 9, 15):
+            UserFavoriteRestaurant.objects.create(
+                user=self.user, restaurant=self.restaurants[i])
+        indexed = self.content(order='distance', limit=4)
+        self.assertEqual([r['idRestaurant'] for r in
+                          indexed['content']['favoriteRestaurants']],
+                         [self.restaurants[i].pk for i in (15, 9, 5, 2)])
+        with self.settings(RESTAURANT_SPATIAL_INDEX=False):
+            self.assertEqual(indexed, self.content(order='distance',
+                                                   limit=4))
+
+    def test_incremental_refresh(self):
+        index = get_restaurant_index()
+        self.assertEqual(len(index.within(57.0, -2.0, 50)), 20)
+        Restaurant.objects.filter(pk=self.restaurants[0].pk)\
+            .update(deleted=timezone.now())
+        self.restaurants[1].latitude = '10.000000'
+        self.restaurants[1].save()
+        index.refresh()
+        self.assertEqual(len(index.within(57.0, -2.0, 50)), 18)
+        self.assertEqual(list(index.within(10.0, -2.01, 1)),
+                         [self.restaurants[1].pk])
+
+
+class BatchStatusDistanceTest(RestaurantTestData, TestCase):
+
+    def test_matches_status_distance(self):
+        request = mock.Mock(GET={'latitude': '57.149453',
+                                 'longitude': '-2.172841'})
+        objs = list(Restaurant.objects.all())
+        for now in (datetime(2020, 1, 1, 1, 30), datetime(2020, 1, 1, 9),
+                    datetime(2020, 1, 1, 22, 0, 1)):
+            with mock.patch('services.views.restaurant.datetime') as clock:
+                clock.utcnow.return_value = now
+                expected = [status_distance(request, obj) for obj in objs]
+            self.assertEqual(
+                batch_status_distance(57.149453, -2.172841, objs,
+                                      now=now.time()),
+                expected)
+
+
+class FastSerializerTest(RestaurantTestData, TestCase):
+
+    def test_same_json_as_restaurant_serializer(self):
+        Restaurant.objects.filter(pk=self.restaurants[2].pk).update(
+            address2=None, email=None, phones={})
+        for params in ({}, {'limit': 5, 'page': 1, 'order': '-city'},
+                       {'radius': 20}, {'order': 'distance', 'limit': 7}):
+            with self.settings(RESTAURANT_FAST_SERIALIZER=True):
+                fast = self.get_restaurants(**params).content
+            self.assertEqual(fast, self.get_restaurants(**params).content)
+
+
+class ConcurrentQueriesTest(RestaurantTestData, TransactionTestCase):
+    """Pool threads use their own connections, so the data is committed."""
+
+    def setUp(self):
+        self.setUpTestData()
+        super(ConcurrentQueriesTest, self).setUp()
+
+    def test_same_response_as_serial_queries(self):
+        for params in ({}, {'limit': 5, 'page': 1, 'order': '-city'},
+                       {'radius': 20, 'order': 'city'},
+                       {'order': 'distance', 'limit': 7}):
+            expected = self.get_restaurants(**params).content
+            cache.clear()
+            with self.settings(CONCURRENT_QUERIES=True):
+                self.assertEqual(self.get_restaurants(**params).content,
+                                 expected)
+
+
+class InstrumentationTest(RestaurantTestData, TestCase):
+
+    def test_server_timing(self):
+        self.assertNotIn('Server-Timing', self.get_restaurants())
+        with self.settings(INSTRUMENTATION_SAMPLE_RATE=1), \
+                self.assertLogs('utils.instrumentation') as logs, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.get_restaurants(radius=20)
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="%d queries"' % len(queries), timing)
+        for name in ('serializer', 'geo', 'total'):
+            self.assertIn('%s;dur=' % name, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['path'], record['status'],
+                          record['queries']),
+                         (reverse('services:restaurant_collection'), 200,
+                          len(queries)))
+
+
+class OpeningHoursTest(RestaurantTestData, TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(opening_ranges(time(9), time(22, 30))[:2],
+                         [(0, 540, 1350), (1, 540, 1350)])
+        self.assertEqual(opening_ranges(time(22), time(2))[-2:],
+                         [(6, 0, 120), (6, 1320, 1440)])
+        self.assertEqual(len(opening_ranges(time(9), time(9))), 14)
+
+    def test_open_filters_match_status(self):
+        # closing at 22:00 for every third restaurant, 2:00 for the others
+        for clock, total in ((time(12), 19), (time(22), 19),
+                             (time(22, 0, 1), 13), (time(2), 13),
+                             (time(8, 59), 0)):
+            with mock.patch('services.views.restaurant.datetime') as dt:
+                dt.utcnow.return_value = datetime.combine(
+                    datetime(2020, 1, 6), clock)
+                dt.combine = datetime.combine
+                content = self.get_restaurants(open_now='true',
+                                               limit=20).json()
+            self.assertEqual(content['_metadata']['totalRecords'], total)
+            listed = content['content']['restaurants'] + \
+                content['content']['favoriteRestaurants']
+            self.assertTrue(all(r['status'].startswith('Open now')
+                                for r in listed))
+        self.assertEqual(self.get_restaurants(open_at='23:00', radius=50)
+                         .json()['_metadata']['totalRecords'], 13)
+        self.assertEqual(self.get_restaurants(open_at='25:00').status_code,
+                         400)
+
+    def test_synced_on_save(self):
+        restaurant = self.restaurants[0]
+        restaurant.closingTime = time(1)
+        restaurant.save()
+        self.assertEqual(restaurant.openingHours.count(), 14)
+
+    def test_extra_intervals_kept(self):
+        restaurant = self.restaurants[0]
+        restaurant.openingHours.create(weekday=6, opens=0, closes=60)
+        restaurant.restaurantName = 'Renamed'
+        restaurant.save()
+        self.assertEqual(restaurant.openingHours.count(), 8)
+        restaurant.closingTime = time(23)
+        restaurant.save()
+        self.assertEqual(restaurant.openingHours.count(), 7)
+
+
+class SearchIndexTest(RestaurantTestData, TestCase):
+
+    def total(self, **params):
+        response = self.get_restaurants(limit=100, **params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['_metadata']['totalRecords']
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  Crème  BRÛLÉE '), 'creme brulee')
+        self.assertEqual(normalize('Straße'), 'strasse')
+
+    def test_lookups(self):
+        # 20 restaurants, one blocked
+        self.assertEqual(self.total(restaurantName__icontains='ANT 1'), 10)
+        self.assertEqual(self.total(restaurantName__istartswith='rest'), 19)
+        self.assertEqual(self.total(restaurantName__iendswith='5'), 2)
+        self.assertEqual(self.total(restaurantName__icontains='t'), 19)
+        self.assertEqual(self.total(city__icontains='burg'), 9)
+        self.assertEqual(self.total(city__iendswith='deen',
+                                    restaurantName__icontains='1'), 6)
+
+    def test_prefix_uses_index(self):
+        _, lookups = indexed_lookups({'restaurantName__istartswith': 'Rest'})
+        plan = Restaurant.objects.filter(*lookups, deleted__isnull=True)\
+            .explain()
+        self.assertIn('restaurant_search_name_idx', plan)
+        self.assertEqual(self.total(restaurantName__istartswith='restaurant '
+                                                              '0'), 9)
+        self.assertEqual(self.total(restaurantName__istartswith='restaurant '
+                                                              '1-'), 0)
+
+    def test_raw_whitespace(self):
+        # the normalized columns have the spaces collapsed, not the lookups
+        self.assertEqual(self.total(city__icontains='   '), 0)
+        self.assertEqual(self.total(restaurantName__icontains='ant  1'), 0)
+        self.assertEqual(self.total(restaurantName__istartswith=' rest'), 0)
+        self.assertEqual(self.total(restaurantName__iendswith='5 '), 0)
+        self.assertEqual(self.total(restaurantName__icontains='t 1'), 10)
+
+    def test_accents_and_updates(self):
+        restaurant = self.restaurants[3]
+        restaurant.restaurantName = 'Crème Brûlée'
+        restaurant.save(update_fields=['restaurantName'])
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.searchName, 'creme brulee')
+        self.assertEqual(self.total(restaurantName__icontains='crème BR'), 1)
+        self.assertEqual(self.total(restaurantName__icontains='brûl'), 1)
+        self.assertEqual(self.total(restaurantName__istartswith='Restaurant 03'),
+                         0)
+
+    def test_relevance(self):
+        content = self.get_restaurants(q='restaurnt 07').json()
+        self.assertEqual(content['_metadata']['order'], '-relevance')
+        self.assertEqual(content['content']['restaurants'][0]['restaurantName'],
+                         'Restaurant 07')
+        self.assertEqual(self.total(q='edinburg'), 9)
+        self.assertEqual(self.total(q='x'), 0)
+        self.assertEqual(self.get_restaurants(q='x' * 101).status_code, 400)
+        # relevance ordering needs q
+        self.assertEqual(self.get_restaurants(order='-relevance')
+                         .json()['_metadata']['order'], 'idRestaurant')
+
+    def listed(self, content):
+        return [r['idRestaurant'] for r in
+                content['content']['favoriteRestaurants'] +
+                content['content']['restaurants']]
+
+    def test_relevance_cursor_pages(self):
+        expected = self.listed(self.get_restaurants(q='restaurant 1',
+                                                    limit=100).json())
+        listed, cursor = list(), ''
+        while cursor is not None:
+            content = self.get_restaurants(q='restaurant 1', limit=3,
+                                           cursor=cursor).json()
+            listed.extend(self.listed(content))
+            cursor = content['_metadata']['nextCursor']
+        self.assertEqual(listed, expected)
+        for params in ({}, {'radius': 50}):
+            with self.settings(RESTAURANT_FAST_SERIALIZER=True):
+                content = self.get_restaurants(q='restaurant 1', limit=3,
+                                               cursor='', **params).json()
+            self.assertEqual(self.listed(content), expected[:3])
+
+
+@override_settings(RESTAURANT_EXPORT_CHUNK_SIZE=3)
+class RestaurantExportTest(RestaurantTestData, TestCase):
+
+    def export(self, **params):
+        params.setdefault('userId', self.user.pk)
+        params.setdefault('latitude', '57.149453')
+        params.setdefault('longitude', '-2.172841')
+        return self.client.get(reverse('services:restaurant_export'), params)
+
+    def listed(self, **params):
+        content = self.get_restaurants(limit=100, **params).json()['content']
+        return content['favoriteRestaurants'] + content['restaurants']
+
+    def test_ndjson_matches_list(self):
+        for params in ({}, {'radius': 20}, {'q': 'restaurant 1'},
+                       {'order': '-city', 'city__icontains': 'deen'}):
+            response = self.export(**params)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            items = [json.loads(line) for line in b''.join(
+                response.streaming_content).decode().splitlines()]
+            self.assertEqual(
+                sorted(item.pop('isFavorite') for item in items)[-1], True)
+            expected = self.listed(**params)
+            self.assertEqual(sorted(items, key=lambda i: i['idRestaurant']),
+                             sorted(expected, key=lambda i: i['idRestaurant']))
+        self.assertEqual(len(items), 10)
+
+    def test_csv(self):
+        response = self.export(output='CSV', order='-idRestaurant')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(b''.join(
+            response.streaming_content).decode())))
+        self.assertEqual(len(rows), 19)
+        self.assertEqual(rows[0]['idRestaurant'],
+                         str(self.restaurants[-1].pk))
+        self.assertEqual(rows[0]['country'], '826')
+        self.assertEqual(json.loads(rows[0]['phones']), {'mobile': '019'})
+
+    def test_asgi(self):
+        # the test database connection has to outlive the request
+        request_started.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+
+        async def export():
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http', 'method': 'GET',
+                'headers': [(b'host', b'testserver')],
+                'path': reverse('services:restaurant_export'),
+                'query_string': urlencode({
+                    'userId': self.user.pk, 'latitude': '57.149453',
+                    'longitude': '-2.172841'}).encode()})
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output(5)
+            body = list()
+            while True:
+                message = await communicator.receive_output(5)
+                body.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    return start['status'], b''.join(body)
+
+        status, body = async_to_sync(export)()
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body.decode().splitlines()), 19)
+
+    def test_invalid(self):
+        self.assertEqual(self.export(output='xml').status_code, 400)
+        response = self.export(order='distance')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'order': 'invalid order'})
+        self.assertEqual(self.export(latitude='x').status_code, 400)
+
+
+class RestaurantListingTest(RestaurantTestData, TestCase):
+
+    def test_same_responses(self):
+        for params in ({}, {'radius': 20}, {'order': '-city', 'limit': 5},
+                       {'q': 'restaurant 1'}, {'open_at': '22:00'},
+                       {'open_at': '02:01', 'radius': 50},
+                       {'country': 'United'}, {'cursor': '', 'limit': 3},
+                       {'restaurantName__icontains': 'ant 1'}):
+            expected = self.get_restaurants(**params).json()
+            with self.settings(RESTAURANT_LISTING=True):
+                self.assertEqual(self.get_restaurants(**params).json(),
+                                 expected)
+
+    def test_open_at_extra_intervals(self):
+        # open 9:00-22:00 and 6:00-8:00 on every day
+        restaurant = self.restaurants[3]
+        restaurant.openingHours.bulk_create([
+            OpeningHours(restaurant=restaurant, weekday=weekday, opens=360,
+                         closes=480) for weekday in range(7)])
+        for listing in (False, True):
+            with self.settings(RESTAURANT_LISTING=listing):
+                content = self.get_restaurants(open_at='07:00').json()
+            self.assertEqual([r['idRestaurant'] for r in
+                              content['content']['restaurants']],
+                             [restaurant.pk])
+
+    def test_signals(self):
+        restaurant = self.restaurants[1]
+        restaurant.restaurantName = 'Crème Brûlée'
+        restaurant.save()
+        listing = RestaurantListing.objects.get(pk=restaurant.pk)
+        self.assertEqual(listing.searchName, 'creme brulee')
+        self.country.countryName = 'Great Britain'
+        self.country.save()
+        self.assertEqual(RestaurantListing.objects.filter(
+            countryName='Great Britain').count(), 20)
+        restaurant.deleted = timezone.now()
+        restaurant.save()
+        self.assertFalse(RestaurantListing.objects.filter(
+            pk=restaurant.pk).exists())
+
+    @override_settings(RESTAURANT_LISTING_SYNC_OVERLAP=0)
+    def test_refresh(self):
+        # writes without signals
+        Restaurant.objects.filter(pk=self.restaurants[2].pk).update(
+            deleted=timezone.now())
+        Restaurant.objects.filter(pk=self.restaurants[3].pk).update(
+            city='Leeds', updated=timezone.now())
+        self.assertLess(refresh_listing(), 20)
+        self.assertFalse(RestaurantListing.objects.filter(
+            pk=self.restaurants[2].pk).exists())
+        self.assertEqual(RestaurantListing.objects.get(
+            pk=self.restaurants[3].pk).city, 'Leeds')
+        RestaurantListing.objects.all().delete()
+        call_command('sync_restaurant_listing', stdout=io.StringIO())
+        self.assertEqual(RestaurantListing.objects.count(), 19)
+
+
+class SlidingWindowThrottleTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.'
+                                         'LocMemCache'},
+                  'throttle': {'BACKEND': 'django.core.cache.backends.'
+                                          'filebased.FileBasedCache',
+                               'LOCATION': directory.name}}
+        settings = self.settings(CACHES=caches, THROTTLE_CACHE='throttle')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.object(UserSlidingWindowThrottle, 'THROTTLE_RATES',
+                                    {'user': '4/minute'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def allow(self, now, user_pk=1):
+        request = RequestFactory().get('/')
+        request.user = mock.Mock(is_authenticated=True, pk=user_pk)
+        throttle = UserSlidingWindowThrottle()
+        throttle.timer = lambda: now
+        return throttle.allow_request(request, None), throttle
+
+    def test_sliding_window(self):
+        start = 600000.0
+        self.assertEqual([self.allow(start + i)[0] for i in range(5)],
+                         [True] * 4 + [False])
+        allowed, throttle = self.allow(start + 5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 55 + 15)
+        self.assertTrue(self.allow(start + 5, user_pk=2)[0])
+        # 4 in the previous window, 5/6 of it still overlaps
+        allowed, throttle = self.allow(start + 70)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 5)
+        self.assertEqual([self.allow(start + 76)[0] for i in range(2)],
+                         [True, False])
+        self.assertTrue(self.allow(start + 120)[0])
+
+
+class ProductionSettingsTest(TestCase):
+
+    def production_settings(self, **environ):
+        sys.modules.pop('restaurant_choices.settings_production', None)
+        with mock.patch.dict(os.environ, environ):
+            return importlib.import_module(
+                'restaurant_choices.settings_production')
+
+    def test_profile(self):
+        production = self.production_settings(SECRET_KEY='production')
+        self.assertEqual(production.SECRET_KEY, 'production')
+        self.assertFalse(production.DEBUG)
+        self.assertFalse(set(production.DEVELOPMENT_APPS) &
+                         set(production.INSTALLED_APPS))
+        self.assertFalse([middleware for middleware in production.MIDDLEWARE
+                          if 'debug_toolbar' in middleware])
+        options = production.TEMPLATES[0]['OPTIONS']
+        self.assertEqual(options['loaders'][0][0],
+                         'django.template.loaders.cached.Loader')
+
+    def test_secret_key_required(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SECRET_KEY', None)
+            with self.assertRaises(ImproperlyConfigured):
+                self.production_settings()
+
+    def test_prewarm_and_lazy_schema(self):
+        prewarm()
+        schema = RestaurantCollection().schema
+        self.assertIs(schema, RestaurantCollection().schema)
+        self.assertIn('q', [field.name for field in schema._fields])
+
+
+class ApiSchemaTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = '%s/api_schema.json' % directory.name
+        settings = override_settings(API_SCHEMA_FILE=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_api_schema()
+        self.addCleanup(reset_api_schema)
+
+    def test_generated_once_and_revalidated(self):
+        out = io.StringIO()
+        call_command('generate_api_schema', stdout=out)
+        self.assertIn(self.path, out.getvalue())
+
+        with mock.patch('utils.schemas.generate_schema') as generate:
+            response = self.client.get('/', HTTP_ACCEPT='application/json')
+            self.client.get('/')
+        generate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        document = json.loads(response.content)
+        self.assertEqual(document['info']['title'], 'Restaurant Choices API')
+        self.assertIn('/services/v1/restaurant/', document['paths'])
+        parameters = document['paths']['/services/v1/restaurant/']['get'][
+            'parameters']
+        self.assertIn('q', [parameter['name'] for parameter in parameters])
+
+        cached = self.client.get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual((cached.status_code, cached.content), (304, b''))
+        cached = self.client.get(
+            '/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.post('/').status_code, 405)
+
+    def test_missing_without_coreapi(self):
+        with mock.patch('utils.schemas.generate_schema',
+                        side_effect=ImportError('No module named coreapi')):
+            with self.assertLogs('utils.startup', 'WARNING'):
+                prewarm()
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(b'manage.py generate_api_schema', response.content)
+
+    def test_swagger_ui(self):
+        response = self.client.get('/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/services/v1/restaurant/', response.content)
+        self.assertFalse(response.has_header('ETag'))
+
+
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTest(RestaurantTestData, TransactionTestCase):
+    databases = {'default'} | set(REPLICAS)
+
+    @classmethod
+    def setUpClass(cls):
+        # stand-in replicas, more connections to the test database
+        for alias in REPLICAS:
+            connections.databases[alias] = dict(
+                connections.databases['default'])
+        super(ReplicaRoutingTest, cls).setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(ReplicaRoutingTest, cls).tearDownClass()
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+
+    def setUp(self):
+        self.setUpTestData()
+        super(ReplicaRoutingTest, self).setUp()
+        for alias in REPLICAS:
+            self.addCleanup(mark_healthy, alias)
+
+    def queries_per_alias(self, **params):
+        contexts = dict((alias, CaptureQueriesContext(connections[alias]))
+                        for alias in ['default'] + REPLICAS)
+        for context in contexts.values():
+            context.__enter__()
+        try:
+            # every alias sees the same data
+            self.assertEqual(self.get_restaurants(**params).json()
+                             ['_metadata']['totalRecords'], 19)
+        finally:
+            for context in contexts.values():
+                context.__exit__(None, None, None)
+        return dict((alias, len(context))
+                    for alias, context in contexts.items())
+
+    def test_reads_from_a_healthy_replica(self):
+        queries = self.queries_per_alias(radius=20)
+        self.assertEqual(queries['default'], 0)
+        self.assertEqual(len([n for n in queries.values() if n]), 1)
+
+        mark_unhealthy('replica_1')
+        queries = self.queries_per_alias()
+        self.assertEqual((queries['default'], queries['replica_1']), (0, 0))
+        mark_unhealthy('replica_2')
+        self.assertEqual(self.queries_per_alias()['replica_2'], 0)
+
+    def test_sticky_after_list_change(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('services:user_favorites', args=[self.user.pk]),
+            json.dumps([self.restaurants[9].pk]),
+            content_type='application/json')
+        queries = self.queries_per_alias()
+        self.assertEqual(queries['replica_1'] + queries['replica_2'], 0)
+        self.assertGreater(queries['default'], 0)
+
+    def test_unhealthy_on_connection_errors_only(self):
+        with self.assertRaises(OperationalError):
+            with replica_reads():
+                raise OperationalError(1205, 'Lock wait timeout exceeded')
+        self.assertEqual(healthy_replicas(), REPLICAS)
+        with self.assertRaises(ReplicaUnavailable):
+            with replica_reads() as alias:
+                raise OperationalError(2006, 'MySQL server has gone away')
+        self.assertNotIn(alias, healthy_replicas())
+
+
+class ConnectionPoolTest(TestCase):
+
+    def test_reuse_limit_and_recycle(self):
+        pool = ConnectionPool(size=2, recycle=3600, idle_timeout=300,
+                              timeout=0.01)
+        first = pool.acquire(mock.Mock)
+        second = pool.acquire(mock.Mock)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(mock.Mock)
+        pool.release(first)
+        self.assertIs(pool.acquire(mock.Mock), first)
+        pool.release(second, reusable=False)
+        second.close.assert_called_once_with()
+        self.assertIsNot(pool.acquire(mock.Mock), second)
+        self.assertEqual(
+            dict((key, pool.stats()[key]) for key in
+                 ('inUse', 'idle', 'opened', 'closed', 'waits', 'timeouts')),
+            {'inUse': 2, 'idle': 0, 'opened': 3, 'closed': 1, 'waits': 1,
+             'timeouts': 1})
+
+        pool.release(first)
+        pool.idle_timeout = 0
+        self.assertIsNot(pool.acquire(mock.Mock), first)
+        first.close.assert_called_once_with()
+
+    def test_stats_endpoint(self):
+        url = reverse('services:database_pool_stats')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create(username='staff',
+                                                    is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(set(response.json()), {'pools', 'healthChecks'})
+
+
+class ImportRestaurantsTest(RestaurantTestData, TestCase):
+
+    def import_rows(self, suffix, text, **options):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix) as f:
+            f.write(text)
+            f.flush()
+            out, err = io.StringIO(), io.StringIO()
+            call_command('import_restaurants', f.name, stdout=out,
+                         stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_insert_and_jsonl_upsert(self):
+        version = catalogue_version()
+        out, err = self.import_rows('.csv', (
+            'country,restaurantName,address1,city,phones,openingTime,'
+            'closingTime,latitude,longitude\n'
+            'GB,New,1 High St,Leeds,"{""mobile"": ""01""}",09:00,23:00,'
+            '53.8,-1.5\n'
+            'XX,Bad,1 High St,Leeds,,09:00,23:00,53.8,-1.5\n'
+            'GBR,Bad,1 High St,Leeds,,25:00,23:00,93.8,-1.5\n'),
+            batch_size=1)
+        self.assertIn('1 rows imported, 2 invalid', out)
+        self.assertIn('line 3', err)
+        self.assertIn('latitude', err)
+        new = Restaurant.objects.get(restaurantName='New')
+        self.assertEqual((new.country_id, new.phones, new.address2),
+                         (826, {'mobile': '01'}, ''))
+        self.assertNotEqual(catalogue_version(), version)
+
+        existing = self.restaurants[3]
+        Restaurant.objects.filter(pk=existing.pk).update(
+            deleted=timezone.now())
+        self.import_rows('.jsonl', json.dumps({
+            'idRestaurant': existing.pk, 'country': 826,
+            'restaurantName': 'Renamed', 'address1': 'x', 'city': 'York',
+            'openingTime': '08:00', 'closingTime': '20:00',
+            'latitude': 53.96, 'longitude': -1.08}) + '\n')
+        existing.refresh_from_db()
+        self.assertEqual((existing.restaurantName, existing.deleted,
+                          str(existing.latitude)),
+                         ('Renamed', None, '53.960000'))
+        self.assertEqual(Restaurant.objects.count(), 21)
+        self.assertEqual(new.openingHours.count(), 7)
+        self.assertEqual(existing.openingHours.count(), 7)
@@ -1,10 +1,25 @@
 from django.urls import path
-from .views import restaurant
+from .views import database, restaurant, user
 
 app_name = "services"
 urlpatterns = [
     path("v1/restaurant/",
          view=restaurant.RestaurantCollection.as_view(),
          name="restaurant_collection"),
+    path("v1/restaurant/export/",
+         view=restaurant.RestaurantExport.as_view(),
+         name="restaurant_export"),
+    path("v1/restaurant/cache/",
+         view=restaurant.RestaurantCacheStats.as_view(),
+         name="restaurant_cache_stats"),
+    path("v1/users/<int:user_id>/favorites/",
+         view=user.UserFavoriteCollection.as_view(),
+         name="user_favorites"),
+    path("v1/users/<int:user_id>/blocklist/",
+         view=user.UserBlocklistCollection.as_view(),
+         name="user_blocklist"),
+    path("v1/database/pool/",
+         view=database.DatabasePoolStats.as_view(),
+         name="database_pool_stats"),
 
 ]
@@ -0,0 +1,23 @@
+# python
+from __future__ import unicode_literals
+# libs
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+# local
+from utils.db_pool import pool_stats
+
+
+class DatabasePoolStats(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Connection pool metrics of this process (in use, idle, waits, wait
+        time, timeouts) and persistent connection health check counters,
+        staff only.
+
+        :returns: pools per database alias and healthChecks
+        :rtype: json
+        """
+        return Response(pool_stats())
@@ -1,22 +1,46 @@
 # python
 from __future__ import unicode_literals
+import csv
+import math
 from datetime import datetime, time
-from math import radians, cos, sin, asin, sqrt
 from decimal import Decimal
+from functools import partial
+from operator import attrgetter, itemgetter
 # libs
-import coreapi
-import coreschema
+import numpy as np
+from django.conf import settings
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.http import StreamingHttpResponse
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework import schemas
+from rest_framework.utils.encoders import JSONEncoder
 # local
 from utils import exceptions
-from ..models import (Country, Restaurant, UserFavoriteRestaurant,
-                      UserBlocklistRestaurant)
+from utils.concurrency import run_concurrently
+from utils.instrumentation import timed
+from utils.routers import ReplicaUnavailable, replica_reads
+from utils.schemas import LazySchema
+from utils.geo import (EARTH_RADIUS_MILES, bounding_box_q, haversine,
+                       haversine_many)
+from ..models import (Country, Restaurant, RestaurantListing,
+                      UserFavoriteRestaurant, UserBlocklistRestaurant)
+from ..cache import (cache_response, catalogue_version, get_cached_response,
+                     get_user_restaurants, response_cache_key,
+                     response_cache_stats)
 from ..controllers.restaurant import RestaurantListController
-from ..serializers import RestaurantSerializer
+from ..hours import open_at_q
+from ..search import indexed_lookups, relevance_search
+from ..serializers import (LISTING_VALUES, RESTAURANT_VALUES,
+                           RestaurantSerializer, listing_values_data,
+                           restaurant_values_data)
+from ..spatial import get_restaurant_index
+
+
+# miles, no two points are further apart
+EARTH_HALF_CIRCUMFERENCE = math.pi * EARTH_RADIUS_MILES
 
 
 def status_distance(userData, object):
@@ -24,17 +48,9 @@ def status_distance(userData, object):
     retuns distance btween user and restaurant, 
     currently open status """
 
-    # convert decimal degrees to radians 
-    lon1, lat1, lon2, lat2 = map(radians, [Decimal(userData.GET['longitude']),
-                                          Decimal(userData.GET['latitude']),
-                                           object.longitude, object.latitude])
-    # haversine formula 
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a)) 
-    # Radius of earth in kilometers is 6371
-    miles =  '%0.1f Miles' %(6371 * c  * 0.62137)
+    miles = '%0.1f Miles' % haversine(Decimal(userData.GET['latitude']),
+                                      Decimal(userData.GET['longitude']),
+                                      object.latitude, object.longitude)
 
     # to check restaurant currently open
     if object.openingTime < object.closingTime:
@@ -53,9 +69,328 @@ def status_distance(userData, object):
     return [miles, status]
 
 
-class RestaurantCollection(APIView):
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second + \
+        value.microsecond / 1e6
+
+
+def batch_status_distance(latitude, longitude, objects, now=None):
+    """ helper function for RestaurantCollection
+    vectorized status_distance for a page of restaurants, the user
+    coordinates are parsed and the clock is read once for all of them.
+    returns [distance, status] pairs in the order of objects """
+
+    objects = list(objects)
+    if not objects:
+        return []
+    count = len(objects)
+    # model instances or .values() rows
+    getter = itemgetter if isinstance(objects[0], dict) else attrgetter
+    coordinates = getter('latitude', 'longitude')
+    hours = getter('openingTime', 'closingTime')
+    coordinates = np.array([coordinates(obj) for obj in objects],
+                           dtype=np.float64).reshape(count, 2)
+    miles = haversine_many(latitude, longitude, coordinates[:, 0],
+                           coordinates[:, 1])
+
+    # opening hours repeat a lot, convert each distinct time once
+    hours = [hours(obj) for obj in objects]
+    seconds = dict()
+    for pair in hours:
+        for value in pair:
+            if value not in seconds:
+                seconds[value] = _seconds(value)
+    opening = np.fromiter((seconds[pair[0]] for pair in hours), np.float64,
+                          count)
+    closing = np.fromiter((seconds[pair[1]] for pair in hours), np.float64,
+                          count)
+    now = _seconds(now or datetime.utcnow().time())
+    is_open = np.where(opening < closing,
+                       (now >= opening) & (now <= closing),
+                       # Over midnight
+                       (now >= opening) | (now <= closing))
+
+    closes = dict((value, 'Open now: Closes at ' +
+                   value.strftime("%I:%M %p")) for value in seconds)
+    opens = dict((value, 'Closed  now: Opens at ' +
+                  value.strftime("%I:%M %p")) for value in seconds)
+    return [['%0.1f Miles' % distance,
+             closes[pair[1]] if open_now else opens[pair[0]]]
+            for pair, distance, open_now in zip(hours, miles.tolist(),
+                                                is_open.tolist())]
+
+
+def seconds_to_status_change(objects, now):
+    """ helper function for RestaurantCollection
+    seconds (at least 1) until the open/closed status of one of the
+    restaurants changes """
+
+    getter = itemgetter if isinstance(objects[0], dict) else attrgetter
+    hours = getter('openingTime', 'closingTime')
+    now = _seconds(now)
+    boundaries = set()
+    for opening, closing in (hours(obj) for obj in objects):
+        boundaries.add(opening)
+        boundaries.add(closing)
+    return max(1, int(min((_seconds(value) - now) % 86400
+                          for value in boundaries)))
+
+
+def after_cursor_q(order, cursor, favorites):
+    """ helper function for RestaurantCollection
+    keyset filter of the rows that come after cursor [is_favorite, order
+    value, idRestaurant] when sorted favorites first, then by order and
+    idRestaurant. NULLs sort first, as they do on MySQL """
+
+    favorite, value, pk = cursor
+    field = order.lstrip('-')
+    descending = order.startswith('-')
+    if field == 'idRestaurant':
+        rest = Q(idRestaurant__lt=pk) if descending else Q(idRestaurant__gt=pk)
+    elif value is None:
+        rest = Q(**{'%s__isnull' % field: True, 'idRestaurant__gt': pk})
+        if not descending:
+            rest |= Q(**{'%s__isnull' % field: False})
+    else:
+        rest = Q(**{field: value, 'idRestaurant__gt': pk})
+        if descending:
+            rest |= Q(**{'%s__lt' % field: value}) | \
+                Q(**{'%s__isnull' % field: True})
+        else:
+            rest |= Q(**{'%s__gt' % field: value})
+
+    if not favorites:
+        return rest
+    is_favorite = Q(idRestaurant__in=favorites)
+    if favorite:
+        return (is_favorite & rest) | ~is_favorite
+    return ~is_favorite & rest
+
+
+def filtered_restaurants(controller, request, error_code):
+    """ helper function for RestaurantCollection and RestaurantExport
+    returns the search kwargs, the active restaurants matching the filters
+    of the valid controller (search, country, q, open_now/open_at) and the
+    datetime the open filter applies to, if any. the restaurants come from
+    the RestaurantListing read model when settings.RESTAURANT_LISTING is
+    on """
 
-    schema = schemas.ManualSchema(fields=[
+    listing = getattr(settings, 'RESTAURANT_LISTING', False)
+    kw = controller.cleaned_data['search']
+    if "country" in request.GET:
+        kw['countryName__contains' if listing else
+           'country__countryName__contains'] = request.GET['country']
+
+    # name and city lookups go through the search columns, see
+    # services.search
+    search, lookups = indexed_lookups(kw)
+    try:
+        if listing:
+            base = RestaurantListing.objects.filter(*lookups, **search)
+        else:
+            base = Restaurant.objects.filter(*lookups, deleted__isnull=True,
+                                             **search)
+    except (ValueError, ValidationError):
+        raise exceptions.Http400(error_code=error_code,
+                                 errors ='check the search fields in parms'
+                                )
+    q = controller.cleaned_data['q']
+    if q is not None:
+        where, relevance = relevance_search(q)
+        base = base.filter(where).annotate(relevance=relevance)
+    open_at = None
+    if controller.cleaned_data['open_at'] is not None:
+        open_at = datetime.combine(datetime.utcnow().date(),
+                                   controller.cleaned_data['open_at'])
+    elif controller.cleaned_data['open_now']:
+        open_at = datetime.utcnow()
+    if open_at is not None:
+        # RestaurantListing is keyed on idRestaurant too, both go through
+        # the OpeningHours intervals
+        base = base.filter(open_at_q(open_at))
+    return kw, base, open_at
+
+
+def values_serializer():
+    """ helper function for RestaurantCollection and RestaurantExport
+    returns the .values() columns and the item builder of the fast
+    serializer path, the only one of the RestaurantListing read model """
+
+    if getattr(settings, 'RESTAURANT_LISTING', False):
+        return LISTING_VALUES, listing_values_data
+    return RESTAURANT_VALUES, restaurant_values_data
+
+
+def candidate_restaurants(objs, latitude, longitude, radius, order):
+    """ helper function for RestaurantCollection
+    returns [(idRestaurant, distance)] of the restaurants of objs within
+    radius (miles) of the user, in the requested order unless ordering by
+    distance. exact distance is only computed for the rows that survived
+    the bounding box filter of the queryset, or taken from the in-process
+    spatial index when it is enabled. it doesn't depend on the user lists,
+    so it can run concurrently with get_user_restaurants """
+
+    ordering = ['idRestaurant']
+    if order.lstrip('-') != 'distance':
+        ordering.insert(0, order)
+
+    index = get_restaurant_index()
+    if index is not None and radius is not None:
+        with timed('geo'):
+            distances = index.within(latitude, longitude, radius)
+        rows = objs.filter(idRestaurant__in=list(distances))\
+            .order_by(*ordering).values_list('idRestaurant', flat=True)
+        return [(pk, distances[pk]) for pk in rows]
+
+    if radius is not None:
+        objs = objs.filter(bounding_box_q(latitude, longitude, radius))
+    rows = list(objs.order_by(*ordering).values_list(
+        'idRestaurant', 'latitude', 'longitude'))
+    candidates = []
+    with timed('geo'):
+        for pk, lat, lon in rows:
+            distance = haversine(latitude, longitude, lat, lon)
+            if radius is None or distance <= radius:
+                candidates.append((pk, distance))
+    return candidates
+
+
+def nearby_restaurants(objs, candidates, order, page, limit, cursor=None,
+                       favorites=frozenset(), blocklist=frozenset()):
+    """ helper function for RestaurantCollection
+    returns total count and the requested page, (idRestaurant, is_favorite,
+    distance) of the candidate_restaurants, favorites first and without the
+    blocked ones. objs is the list queryset, used to compare the order
+    values of a cursor. cursor (keyset mode) replaces page when given """
+
+    blocked = blocklist - favorites
+    candidates = [(pk, pk in favorites, distance)
+                  for pk, distance in candidates if pk not in blocked]
+
+    key = None
+    if order == 'distance':
+        key = lambda c: (not c[1], c[2], c[0])
+    elif order == '-distance':
+        key = lambda c: (not c[1], -c[2], c[0])
+    if key is not None:
+        candidates.sort(key=key)
+    else:
+        # stable, keeps the database order within each group
+        candidates.sort(key=lambda c: not c[1])
+
+    if cursor is None:
+        return len(candidates), candidates[page * limit:(page + 1) * limit]
+    if not cursor:
+        return len(candidates), candidates[:limit]
+    if key is not None:
+        last = key((cursor[2], cursor[0], cursor[1]))
+        remaining = [c for c in candidates if key(c) > last]
+    else:
+        # order values compare with the database collation, only the
+        # candidates within the radius are compared
+        after = set(objs.filter(after_cursor_q(order, cursor, favorites),
+                                idRestaurant__in=[c[0] for c in candidates])
+                    .values_list('idRestaurant', flat=True))
+        remaining = [c for c in candidates if c[0] in after]
+    return len(candidates), remaining[:limit]
+
+
+def nearest_sql_restaurants(objs, latitude, longitude, page, limit,
+                            cursor=None):
+    """ helper function for RestaurantCollection
+    nearest first page without the spatial index, same result as
+    nearby_restaurants over every restaurant. the favorites are all loaded,
+    the others from bounding boxes of growing radius until enough of them
+    are within the radius: none outside of it can be nearer, so only the
+    restaurants around the user are fetched. cursor (keyset mode) replaces
+    page when given """
+
+    key = lambda c: (not c[1], c[2], c[0])
+    last = key((cursor[2], cursor[0], cursor[1])) if cursor else None
+
+    def after_cursor(queryset, radius=None):
+        """ sorted candidates of the bounding box after the cursor and the
+        number of rows read """
+        if radius is not None:
+            queryset = queryset.filter(bounding_box_q(latitude, longitude,
+                                                      radius))
+        rows = list(queryset.values_list('idRestaurant', 'is_favorite',
+                                         'latitude', 'longitude'))
+        found = []
+        with timed('geo'):
+            for pk, is_favorite, lat, lon in rows:
+                candidate = (pk, is_favorite,
+                             haversine(latitude, longitude, lat, lon))
+                if last is None or key(candidate) > last:
+                    found.append(candidate)
+        return sorted(found, key=key), len(rows)
+
+    total = objs.count()
+    favorites, favorite_count = after_cursor(objs.filter(is_favorite=True))
+    needed = (page + 1) * limit - len(favorites)
+    radius = getattr(settings, 'RESTAURANT_NEAREST_INITIAL_RADIUS', 10)
+    if cursor and not cursor[0]:
+        radius = max(radius, cursor[1])
+    others = []
+    while needed > 0:
+        if radius >= EARTH_HALF_CIRCUMFERENCE:
+            # the whole planet
+            radius = None
+        others, read = after_cursor(objs.filter(is_favorite=False), radius)
+        if radius is None or read == total - favorite_count:
+            # every restaurant was read
+            break
+        # the box corners are further than radius, and so maybe than
+        # restaurants outside the box
+        others = [c for c in others if c[2] <= radius]
+        if len(others) >= needed:
+            break
+        radius *= 4
+
+    return total, (favorites + others)[page * limit:(page + 1) * limit]
+
+
+def nearest_restaurants(index, objs, latitude, longitude, page, limit):
+    """ helper function for RestaurantCollection
+    nearest first page using the spatial index, the candidates grow until
+    enough of them pass the search filters. returns None when the filters
+    are too selective for the index to help """
+
+    max_candidates = getattr(settings, 'RESTAURANT_SPATIAL_INDEX_MAX_CANDIDATES',
+                             5000)
+    # favorites changed since the last refresh may be missing from the
+    # index, their coordinates come with them
+    favorites = sorted(
+        (haversine(latitude, longitude, lat, lon), pk, True)
+        for pk, lat, lon in objs.filter(is_favorite=True).values_list(
+            'idRestaurant', 'latitude', 'longitude'))
+    needed = (page + 1) * limit - len(favorites)
+    others, count = [], needed
+    while needed > 0:
+        if count > max_candidates:
+            return None
+        near = index.nearest(latitude, longitude, count)
+        matching = set(objs.filter(is_favorite=False,
+                                   idRestaurant__in=[pk for _, pk in near])
+                       .values_list('idRestaurant', flat=True))
+        others = [(d, pk, False) for d, pk in near if pk in matching]
+        if len(others) >= needed or len(near) < count:
+            break
+        count *= 4
+
+    return objs.count(), [(pk, is_favorite, d) for d, pk, is_favorite in
+                          favorites + others][page * limit:(page + 1) * limit]
+
+
+def restaurant_list_schema():
+    """Query parameters of RestaurantCollection, coreapi is only imported
+    by the schema generation.
+    """
+    import coreapi
+    import coreschema
+    from rest_framework import schemas
+
+    return schemas.ManualSchema(fields=[
         coreapi.Field(
             "user id",
             required=True,
@@ -98,7 +433,60 @@ class RestaurantCollection(APIView):
             location="query",
             schema=coreschema.String()
         ),
+        coreapi.Field(
+            "q",
+            required=False,
+            location="query",
+            schema=coreschema.String()
+        ),
+        coreapi.Field(
+            "radius",
+            required=False,
+            location="query",
+            schema=coreschema.Number()
+        ),
+        coreapi.Field(
+            "open_now",
+            required=False,
+            location="query",
+            schema=coreschema.Boolean()
+        ),
+        coreapi.Field(
+            "open_at",
+            required=False,
+            location="query",
+            schema=coreschema.String()
+        ),
+        coreapi.Field(
+            "page",
+            required=False,
+            location="query",
+            schema=coreschema.Integer()
+        ),
+        coreapi.Field(
+            "cursor",
+            required=False,
+            location="query",
+            schema=coreschema.String()
+        ),
+        coreapi.Field(
+            "limit",
+            required=False,
+            location="query",
+            schema=coreschema.Integer()
+        ),
+        coreapi.Field(
+            "order",
+            required=False,
+            location="query",
+            schema=coreschema.String()
+        ),
     ])
+
+
+class RestaurantCollection(APIView):
+
+    schema = LazySchema(restaurant_list_schema)
     
     def get(self, request, *args, **kwargs):
 
@@ -108,7 +496,14 @@ class RestaurantCollection(APIView):
         Search options (eg., 'in', 'isnull', 'icontains', 'istartswith',
         'iendswith'). returns all favorite user restaurant including remaining 
         restaurant based search and ensures that Restaurant not blacklisted
-        by user.
+        by user. results are paginated with page/limit, favorite restaurants
+        always come first. radius (miles) limits the search to nearby
+        restaurants, order=distance returns nearest first (-distance needs
+        a radius). open_now=true
+        or open_at=HH:MM (utc, today) keep the open restaurants. q searches
+        names and cities, most relevant first unless another order is given.
+        sending cursor (empty for the first page) switches to keyset paging,
+        pass _metadata.nextCursor to get the next page.
 
         serializer: .serializers.RestaurantSerializer
         omit_serializer: false
@@ -140,62 +535,373 @@ class RestaurantCollection(APIView):
         - name: postcode__iendswith, example: "1XZ"
           required: false
           type: str
+        - name: radius, example: 5
+          required: false
+          type: float
+        - name: q, example: "thai aberdeen"
+          required: false
+          type: str
+        - name: open_now, example: true
+          required: false
+          type: bool
+        - name: open_at, example: "19:30"
+          required: false
+          type: str
+        - name: page, example: 0
+          required: false
+          type: int
+        - name: cursor, example: ""
+          required: false
+          type: str
+        - name: limit, example: 50
+          required: false
+          type: int
+        - name: order, example: "distance"
+          required: false
+          type: str
 
         :returns: filtered restaurant based user search
         :rtype: json
 
     """
 
-        controller = RestaurantListController(data=request.GET, request=request)
-        controller.is_valid()
-        kw = controller.cleaned_data['search']
-
-        if "country" in request.GET:
-            kw['country__countryName__contains'] = request.GET['country']
-       
+        # catalogue reads go to a replica, except right after the user
+        # changed their favorites/blocklist
         try:
-            objs = Restaurant.objects.filter(deleted__isnull=True, **kw)
-        except (ValueError, ValidationError):
+            with replica_reads(sticky_key='user:%s' %
+                               request.GET.get('userId', '').strip()):
+                return self.list_restaurants(request)
+        except ReplicaUnavailable:
+            return self.list_restaurants(request)
+
+    def list_restaurants(self, request):
+        controller = RestaurantListController(data=request.GET, request=request)
+        if not controller.is_valid():
             raise exceptions.Http400(error_code='Restaurant List Error',
-                                     errors ='check the search fields in parms'
-                                    )
-
-        favorite = UserFavoriteRestaurant.objects.filter(deleted__isnull=True, 
-                                                         user = request.GET['userId']
-                                                        ).values_list('restaurant', flat=True)
-        blocklist = UserBlocklistRestaurant.objects.filter(deleted__isnull=True, 
-                                                           user = request.GET['userId']
-                                                        ).values_list('restaurant', flat=True)
-        favoriteList, restaurants = [], []
-        for obj in objs:
-            if obj.idRestaurant in favorite:
-                data = status_distance(request, obj)
-                obj.distance, obj.status = data[0], data[1]
-                favoriteList.append(obj)
-            else:
-                if obj.idRestaurant not in blocklist:
-                    data = status_distance(request, obj)
-                    obj.distance, obj.status = data[0], data[1]
-                    restaurants.append(obj)
+                                     errors=controller.errors)
+        kw, base, open_at = filtered_restaurants(controller, request,
+                                                 'Restaurant List Error')
 
         page = controller.cleaned_data['page']
         limit = controller.cleaned_data['limit']
+        order = controller.cleaned_data.get('order')
+        latitude = controller.cleaned_data['latitude']
+        longitude = controller.cleaned_data['longitude']
+        radius = controller.cleaned_data['radius']
+        cursor = controller.cleaned_data['cursor']
+        if cursor is not None:
+            page = 0
+        fast = getattr(settings, 'RESTAURANT_LISTING', False) or \
+            getattr(settings, 'RESTAURANT_FAST_SERIALIZER', False)
+        q = controller.cleaned_data['q']
+        values, values_data = values_serializer()
+        if q is not None:
+            values += ('relevance',)
+        sql_path = radius is None and order.lstrip('-') != 'distance'
+        index = get_restaurant_index()
+        # nearest first over the whole catalogue, only the restaurants
+        # around the user are loaded
+        nearest = radius is None and order == 'distance'
+
+        # the user lists and the nearby candidates are independent queries,
+        # see utils.concurrency
+        load_lists = partial(get_user_restaurants,
+                             controller.cleaned_data['userId'])
+        load_candidates = None
+        if not sql_path and not nearest:
+            load_candidates = partial(candidate_restaurants, base, latitude,
+                                      longitude, radius, order)
+        candidates = None
+
+        cache_key = None
+        if getattr(settings, 'RESTAURANT_RESPONSE_CACHE', False):
+            # the key needs the user lists version before anything else
+            favorites, blocklist, user_version = load_lists()
+            precision = getattr(settings,
+                                'RESTAURANT_RESPONSE_CACHE_PRECISION', 3)
+            cache_key = response_cache_key(
+                kw, controller.cleaned_data['exclude'], page, limit, order,
+                cursor, radius, round(latitude, precision),
+                round(longitude, precision), user_version,
+                catalogue_version(), fast, q, open_at and [
+                    open_at.weekday(), open_at.hour, open_at.minute,
+                    bool(open_at.second or open_at.microsecond)])
+            response = get_cached_response(cache_key)
+            if response is not None:
+                return Response(response, headers={'X-Cache': 'HIT'})
+        elif load_candidates is not None:
+            (favorites, blocklist, _), candidates = run_concurrently(
+                load_lists, load_candidates)
+        else:
+            favorites, blocklist, _ = load_lists()
+
+        # favorites-first ordering and blocklist exclusion are resolved by
+        # the database, a blocked restaurant is still listed if it is also
+        # one of the user favorites.
+        objs = base
+        if blocklist - favorites:
+            objs = objs.exclude(idRestaurant__in=blocklist - favorites)
+        if favorites:
+            objs = objs.annotate(is_favorite=Case(
+                When(idRestaurant__in=favorites, then=Value(True)),
+                default=Value(False), output_field=BooleanField()))
+        else:
+            objs = objs.annotate(is_favorite=Value(False, BooleanField()))
+
+        if sql_path:
+            ordering = ['-is_favorite', order]
+            if order.lstrip('-') != 'idRestaurant':
+                # unique tie breaker keeps pages stable
+                ordering.append('idRestaurant')
+            objs = objs.order_by(*ordering)
+            page_objs = objs
+            if cursor:
+                page_objs = objs.filter(
+                    after_cursor_q(order, cursor, favorites))
+            if cursor is None:
+                page_objs = page_objs[page * limit:(page + 1) * limit]
+            else:
+                page_objs = page_objs[:limit]
+            if fast:
+                page_objs = page_objs.values(*values)
+            total, objs = run_concurrently(objs.count,
+                                           partial(list, page_objs))
+            distances = None
+        else:
+            result = None
+            if nearest and index is not None and not cursor:
+                result = nearest_restaurants(index, objs, latitude,
+                                             longitude, page, limit)
+            if nearest and result is None:
+                result = nearest_sql_restaurants(objs, latitude, longitude,
+                                                 page, limit, cursor)
+            if result is None:
+                if candidates is None:
+                    candidates = candidate_restaurants(
+                        base, latitude, longitude, radius, order)
+                result = nearby_restaurants(objs, candidates, order, page,
+                                            limit, cursor, favorites,
+                                            blocklist)
+            total, candidates = result
+            ids = [c[0] for c in candidates]
+            distances = [c[2] for c in candidates]
+            if fast:
+                rows = dict((row['idRestaurant'], row) for row in
+                            objs.filter(idRestaurant__in=ids)
+                            .values(*values))
+            else:
+                rows = objs.in_bulk(ids)
+            objs = [rows[pk] for pk in ids]
+
         metadata = {'page': page,
                     'limit': limit,
-                    'order': controller.cleaned_data.get('order'),
-                    'totalRecords': len(favoriteList + restaurants)}
-        if controller.cleaned_data.get('order'):
-            objs = objs.order_by(controller.cleaned_data['order'])
-        objs = objs[page * limit:(page + 1) * limit]
+                    'order': order,
+                    'radius': radius,
+                    'totalRecords': total}
+        if cursor is not None:
+            metadata['nextCursor'] = None
+            if len(objs) == limit:
+                last = objs[-1]
+                getter = itemgetter if fast else attrgetter
+                field = order.lstrip('-')
+                metadata['nextCursor'] = controller.encode_cursor([
+                    getter('is_favorite')(last),
+                    distances[-1] if field == 'distance'
+                    else getter(field)(last),
+                    getter('idRestaurant')(last)])
+
+        now = datetime.utcnow().time()
+        with timed('geo'):
+            status_distances = batch_status_distance(latitude, longitude,
+                                                     objs, now=now)
+        with timed('serializer'):
+            if fast:
+                is_favorite = [row['is_favorite'] for row in objs]
+                data = values_data(objs, status_distances)
+            else:
+                is_favorite = [obj.is_favorite for obj in objs]
+                for obj, data in zip(objs, status_distances):
+                    obj.distance, obj.status = data[0], data[1]
+                data = RestaurantSerializer(instance=objs, many=True).data
+
         response = dict()
         response['content'] = {
-                            'favoriteRestaurants': RestaurantSerializer(
-                                                        instance=favoriteList,
-                                                        many=True).data,
-                            'restaurants': RestaurantSerializer(
-                                                instance=restaurants,
-                                                many=True).data}
+            'favoriteRestaurants': [item for item, favorite
+                                    in zip(data, is_favorite) if favorite],
+            'restaurants': [item for item, favorite
+                            in zip(data, is_favorite) if not favorite]}
 
         response['_metadata'] = metadata
-        return Response(response)
+        if cache_key is None:
+            return Response(response)
+
+        # the cached open/closed status must not outlive the next opening
+        # or closing time of the page
+        timeout = getattr(settings, 'RESTAURANT_RESPONSE_CACHE_TTL', 60)
+        if objs:
+            timeout = min(timeout, seconds_to_status_change(objs, now))
+        if controller.cleaned_data['open_now'] and \
+                controller.cleaned_data['open_at'] is None:
+            # other restaurants open or close as the minute changes
+            timeout = min(timeout, max(1, 60 - open_at.second))
+        cache_response(cache_key, response, timeout)
+        return Response(response, headers={'X-Cache': 'MISS'})
+
+
+class RestaurantCacheStats(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Hit/miss counters of the restaurant list response cache, staff
+        only.
+
+        :returns: hits, misses and hitRatio
+        :rtype: json
+        """
+        return Response(response_cache_stats())
+
+
+# columns of the csv export, the items of the list endpoint flattened
+EXPORT_COLUMNS = ('idRestaurant', 'country', 'restaurantName', 'address1',
+                  'address2', 'address3', 'city', 'postcode', 'phones',
+                  'email', 'website', 'vatNumber', 'currency', 'distance',
+                  'status', 'isFavorite', 'created', 'updated')
+
+
+def export_restaurants(objs, order, latitude, longitude, radius, favorites,
+                       chunk_size, sticky_key=None):
+    """ helper function for RestaurantExport
+    yields lists of the list endpoint items (plus isFavorite) of every
+    restaurant of objs within radius, one per chunk. each chunk is its own
+    keyset query (see after_cursor_q), MySQLdb buffers whole results client
+    side so a single query over the catalogue would not keep the memory
+    flat. the chunk queries go to a replica, each in its own replica_reads
+    block as the generator can be resumed in other threads and contexts
+    (see utils.asgi) """
+
+    ordering = [order]
+    if order.lstrip('-') != 'idRestaurant':
+        ordering.append('idRestaurant')
+    field = order.lstrip('-')
+    values, values_data = values_serializer()
+    values = [name for name in values if name != 'is_favorite']
+    if field not in values:
+        values.append(field)
+    objs = objs.order_by(*ordering).values(*values)
+
+    cursor = None
+    while True:
+        chunk = objs
+        if cursor is not None:
+            chunk = chunk.filter(after_cursor_q(order, cursor, ()))
+        chunk = chunk[:chunk_size]
+        try:
+            with replica_reads(sticky_key=sticky_key):
+                rows = list(chunk.iterator(chunk_size=chunk_size))
+        except ReplicaUnavailable:
+            rows = list(chunk.iterator(chunk_size=chunk_size))
+        if not rows:
+            return
+        last = len(rows) < chunk_size
+        cursor = [False, rows[-1][field], rows[-1]['idRestaurant']]
+        if radius is not None:
+            rows = [row for row in rows if haversine(
+                latitude, longitude, row['latitude'],
+                row['longitude']) <= radius]
+        items = values_data(rows, batch_status_distance(
+            latitude, longitude, rows))
+        for item in items:
+            item['isFavorite'] = item['idRestaurant'] in favorites
+        if items:
+            yield items
+        if last:
+            return
+
+
+def ndjson_lines(chunks):
+    encoder = JSONEncoder(ensure_ascii=False)
+    for items in chunks:
+        yield ''.join(encoder.encode(item) + '\n' for item in items)
+
+
+class _Echo(object):
+    """File-like object handing back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(chunks):
+    writer = csv.writer(_Echo())
+    encoder = JSONEncoder(ensure_ascii=False)
+    yield writer.writerow(EXPORT_COLUMNS)
+    for items in chunks:
+        lines = list()
+        for item in items:
+            country = item['country']
+            item['country'] = country and country['idCountry']
+            item['phones'] = encoder.encode(item['phones'])
+            lines.append(writer.writerow([item[column]
+                                          for column in EXPORT_COLUMNS]))
+        yield ''.join(lines)
+
+
+# output: (content type, file extension, lines)
+EXPORT_OUTPUTS = {
+    'ndjson': ('application/x-ndjson', 'ndjson', ndjson_lines),
+    'csv': ('text/csv; charset=utf-8', 'csv', csv_lines),
+}
+
+
+class RestaurantExport(APIView):
+
+    def get(self, request, *args, **kwargs):
+        """
+        Streams every restaurant matching the filters of the restaurant
+        list (same parameters, page/limit/cursor are ignored) as json lines
+        or csv, favorites are flagged with isFavorite instead of coming
+        first. order=distance is not available.
+
+        parameters:
+        - name: output, example: "csv"
+          required: false
+          type: str
+
+        :returns: ndjson (default) or csv attachment
+        :rtype: stream
+        """
+        output = request.GET.get('output', '').strip().lower() or 'ndjson'
+        if output not in EXPORT_OUTPUTS:
+            raise exceptions.Http400(error_code='Restaurant Export Error',
+                                     errors={'output': 'invalid output'})
+        controller = RestaurantListController(data=request.GET, request=request)
+        if not controller.is_valid():
+            raise exceptions.Http400(error_code='Restaurant Export Error',
+                                     errors=controller.errors)
+        order = controller.cleaned_data['order']
+        if order.lstrip('-') == 'distance':
+            raise exceptions.Http400(error_code='Restaurant Export Error',
+                                     errors={'order': 'invalid order'})
+        _, objs, _ = filtered_restaurants(controller, request,
+                                          'Restaurant Export Error')
+        latitude = controller.cleaned_data['latitude']
+        longitude = controller.cleaned_data['longitude']
+        radius = controller.cleaned_data['radius']
+        user_id = controller.cleaned_data['userId']
+        favorites, blocklist, _ = get_user_restaurants(user_id)
+        if blocklist - favorites:
+            objs = objs.exclude(idRestaurant__in=blocklist - favorites)
+        if radius is not None:
+            objs = objs.filter(bounding_box_q(latitude, longitude, radius))
 
+        content_type, extension, lines = EXPORT_OUTPUTS[output]
+        chunks = export_restaurants(
+            objs, order, latitude, longitude, radius, favorites,
+            getattr(settings, 'RESTAURANT_EXPORT_CHUNK_SIZE', 2000),
+            sticky_key='user:%s' % user_id)
+        response = StreamingHttpResponse(lines(chunks),
+                                         content_type=content_type)
+        response['Content-Disposition'] = \
+            'attachment; filename="restaurants.%s"' % extension
+        return response
@@ -0,0 +1,66 @@
+# python
+from __future__ import unicode_literals
+import json
+# libs
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.urls import NoReverseMatch
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+# local
+from utils.schemas import api_schema
+
+
+def _swagger_ui(request, content):
+    """Swagger UI page of the document content, rest_framework_swagger's
+    template without its schema generation.
+    """
+    from rest_framework_swagger.renderers import SwaggerUIRenderer
+    from rest_framework_swagger.settings import swagger_settings
+
+    renderer = SwaggerUIRenderer()
+    context = {'USE_SESSION_AUTH': swagger_settings.USE_SESSION_AUTH,
+               'drs_settings': json.dumps(renderer.get_ui_settings()),
+               'spec': content.decode()}
+    try:
+        context.update(renderer.get_auth_urls())
+    except NoReverseMatch:
+        # rest_framework login views not routed
+        context['USE_SESSION_AUTH'] = False
+    return render(request, renderer.template, context)
+
+
+@require_safe
+def api_schema_view(request):
+    """
+    OpenAPI (Swagger 2.0) document of the API, generated once per process
+    (see utils.schemas.api_schema) and revalidated with ETag and
+    Last-Modified. Browsers get the Swagger UI when rest_framework_swagger
+    is installed, ?format=openapi forces the document. 503 when neither
+    API_SCHEMA_FILE nor the packages generating it are there.
+    """
+    try:
+        content, etag, modified = api_schema()
+    except ImportError as e:
+        return HttpResponse(
+            'API document unavailable, run `manage.py generate_api_schema` '
+            'to write API_SCHEMA_FILE (%s)\n' % e,
+            status=503, content_type='text/plain')
+    ui = 'rest_framework_swagger' in settings.INSTALLED_APPS
+    if ui and request.GET.get('format') != 'openapi' and \
+            'text/html' in request.META.get('HTTP_ACCEPT', ''):
+        return _swagger_ui(request, content)
+
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=modified)
+    if response is None:
+        response = HttpResponse(content,
+                                content_type='application/openapi+json')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    response['Cache-Control'] = 'no-cache'
+    if ui:
+        patch_vary_headers(response, ['Accept'])
+    return response
@@ -0,0 +1,136 @@
+# python
+from __future__ import unicode_literals
+# libs
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.views import APIView
+# local
+from utils import exceptions
+from utils.permissions import IsUserOrStaff
+from utils.routers import stick_to_primary
+from ..cache import get_user_restaurants, invalidate_user_restaurants
+from ..controllers.user import UserRestaurantListController
+from ..models import (Restaurant, UserFavoriteRestaurant,
+                      UserBlocklistRestaurant)
+
+
+class UserRestaurantList(APIView):
+    """Base view of the user favorite / blocklist restaurants, every change
+    is applied with a few bulk queries in a single transaction. Only the
+    user (or staff) can read and change their lists.
+    """
+    permission_classes = (IsUserOrStaff,)
+    model = None
+    # index of the list in get_user_restaurants()
+    cached_list = None
+
+    def get_controller(self, request, user_id):
+        if not User.objects.filter(pk=user_id).exists():
+            raise exceptions.Http404()
+        data = request.data
+        if not isinstance(data, dict):  # a bare array of ids
+            data = {'restaurants': data}
+        controller = UserRestaurantListController(data=data,
+                                                  request=request)
+        if not controller.is_valid():
+            raise exceptions.Http400(error_code='User Restaurant List Error',
+                                     errors=controller.errors)
+        return controller
+
+    def get(self, request, user_id, *args, **kwargs):
+        """
+        Get the restaurant ids of the user list.
+
+        :returns: restaurant ids
+        :rtype: json
+        """
+        restaurants = get_user_restaurants(user_id)[self.cached_list]
+        return Response({'content': {'restaurants': sorted(restaurants)},
+                         '_metadata': {'userId': user_id,
+                                       'totalRecords': len(restaurants)}})
+
+    def post(self, request, user_id, *args, **kwargs):
+        """
+        Add restaurants to the user list. Adding a restaurant already in the
+        list is a no-op, a previously removed one is restored.
+
+        parameters:
+        - name: restaurants, example: [1, 2, 3] (or the bare array)
+          required: true
+          type: list
+
+        :returns: number of created, restored and unchanged entries
+        :rtype: json
+        """
+        controller = self.get_controller(request, user_id)
+        ids = controller.cleaned_data['restaurants']
+        found = set(Restaurant.objects.filter(idRestaurant__in=ids,
+                                              deleted__isnull=True)
+                    .values_list('idRestaurant', flat=True))
+        if found != ids:
+            raise exceptions.Http400(
+                error_code='User Restaurant List Error',
+                errors={'restaurants': 'unknown restaurant ids: %s' %
+                        sorted(ids - found)})
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = list(self.model.objects.select_for_update()
+                            .filter(user=user_id, restaurant__in=ids))
+            restored = [obj for obj in existing if obj.deleted is not None]
+            for obj in restored:
+                obj.deleted, obj.updated = None, now
+            self.model.objects.bulk_update(restored, ['deleted', 'updated'])
+            # ignore_conflicts keeps concurrent adds idempotent on the
+            # (user, restaurant) unique constraint
+            missing = ids - set(obj.restaurant_id for obj in existing)
+            self.model.objects.bulk_create(
+                [self.model(user_id=user_id, restaurant_id=pk)
+                 for pk in sorted(missing)], ignore_conflicts=True)
+        # bulk queries don't send the model signals
+        invalidate_user_restaurants(user_id)
+        stick_to_primary('user:%s' % user_id)
+
+        return Response({'content': {
+                            'created': len(missing),
+                            'restored': len(restored),
+                            'unchanged': len(existing) - len(restored)},
+                         '_metadata': {'userId': user_id}})
+
+    def delete(self, request, user_id, *args, **kwargs):
+        """
+        Remove restaurants from the user list (soft delete), restaurants not
+        in the list are ignored.
+
+        parameters:
+        - name: restaurants, example: [1, 2, 3] (or the bare array)
+          required: true
+          type: list
+
+        :returns: number of removed entries
+        :rtype: json
+        """
+        controller = self.get_controller(request, user_id)
+        now = timezone.now()
+        with transaction.atomic():
+            deleted = self.model.objects.filter(
+                user=user_id, deleted__isnull=True,
+                restaurant__in=controller.cleaned_data['restaurants'])\
+                .update(deleted=now, updated=now)
+        invalidate_user_restaurants(user_id)
+        stick_to_primary('user:%s' % user_id)
+
+        return Response({'content': {'deleted': deleted},
+                         '_metadata': {'userId': user_id}})
+
+
+class UserFavoriteCollection(UserRestaurantList):
+    model = UserFavoriteRestaurant
+    cached_list = 0
+
+
+class UserBlocklistCollection(UserRestaurantList):
+    model = UserBlocklistRestaurant
+    cached_list = 1
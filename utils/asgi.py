@@ -0,0 +1,47 @@
+# python
+from __future__ import unicode_literals
+# libs
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler as BaseASGIHandler
+
+
+class ASGIHandler(BaseASGIHandler):
+    """Django's ASGIHandler pulling the parts of the streaming responses
+    with sync_to_async, in the thread the view ran in, instead of in the
+    event loop where their iterators can't query the database (eg. the
+    restaurant export) without SynchronousOnlyOperation.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            await super(ASGIHandler, self).send_response(response, send)
+            return
+        headers = [(header.encode('ascii'), value.encode('latin1'))
+                   for header, value in response.items()]
+        headers.extend(
+            (b'Set-Cookie', c.output(header='').encode('ascii').strip())
+            for c in response.cookies.values())
+        await send({'type': 'http.response.start',
+                    'status': response.status_code,
+                    'headers': headers})
+        parts = iter(response)
+        next_part = sync_to_async(next)
+        try:
+            while True:
+                # parts are bytes, None is the end
+                part = await next_part(parts, None)
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body',
+                                'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close)()
+
+
+def get_asgi_application():
+    """django.core.asgi.get_asgi_application serving with ASGIHandler."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
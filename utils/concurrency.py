@@ -0,0 +1,65 @@
+# python
+from __future__ import unicode_literals
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+import threading
+# libs
+from django.conf import settings
+from django.db import close_old_connections
+# local
+from .instrumentation import record_queries
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process wide thread pool running the concurrent queries, sized by
+    settings.CONCURRENT_QUERY_WORKERS.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'CONCURRENT_QUERY_WORKERS',
+                                        4),
+                    thread_name_prefix='query')
+    return _executor
+
+
+def _call(func):
+    # pool threads live outside the request cycle, so apply CONN_MAX_AGE
+    # and drop broken connections the way request_started/finished do
+    close_old_connections()
+    try:
+        with record_queries():
+            return func()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(*calls):
+    """Runs independent read-only callables and returns their results in
+    order. With settings.CONCURRENT_QUERIES on, the first one runs in the
+    calling thread while the others run in the pool, each thread on its own
+    database connection, so the wall time is about the slowest call.
+    Otherwise they run one after the other in the calling thread.
+
+    Callables must evaluate their querysets and must not call
+    run_concurrently themselves. Pool threads don't see uncommitted writes
+    of the calling thread.
+    """
+    if len(calls) < 2 or not getattr(settings, 'CONCURRENT_QUERIES', False):
+        return [call() for call in calls]
+    executor = get_executor()
+    # the calls see the context (request metrics) of the caller
+    futures = [executor.submit(copy_context().run, _call, call)
+               for call in calls[1:]]
+    try:
+        results = [calls[0]()]
+    finally:
+        # never leave pool threads running on behalf of a finished request
+        wait(futures)
+    return results + [future.result() for future in futures]
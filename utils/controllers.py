@@ -1,6 +1,9 @@
 # python
 from __future__ import unicode_literals
+import base64
+import binascii
 import datetime
+from functools import lru_cache
 import json
 import re
 # libs
@@ -11,6 +14,76 @@ from .exceptions import *
 
 
 REMOVE_PATTERN = "[\[\]()\'\"]"
+REMOVE_RE = re.compile(REMOVE_PATTERN)
+
+OPERATORS = frozenset(['in', 'isnull', 'icontains', 'istartswith',
+                       'iendswith', 'iexact', 'gt', 'lt', 'gte', 'lte',
+                       'range', 'year', 'month', 'day', 'week_day',
+                       'hour', 'minute'])
+LIST_OPERATORS = frozenset(['in', 'range'])
+INT_OPERATORS = frozenset(['year', 'month', 'day', 'week_day', 'hour',
+                           'minute'])
+BOOLEAN_VALUES = frozenset(['true', 'false'])
+
+
+def compile_search_fields(search_fields):
+    """Maps every accepted query parameter of Meta.search_fields, the field
+    itself and field__operator for each of its allowed operators, to its
+    (field, operator) pair.
+
+    :param search_fields: dict of allowed search fields mapped against their
+                          available lookup operators
+    :type search_fields: dict
+    """
+    spec = dict()
+    for field, ops in search_fields.items():
+        spec[field] = (field, None)
+        for op in ops:
+            if op in OPERATORS:
+                spec['%s__%s' % (field, op)] = (field, op)
+    return spec
+
+
+@lru_cache(maxsize=1024)
+def parse_search(terms):
+    """Converts (field, operator, value) terms into queryset kwargs items.
+    Query strings repeat a lot, so parsed terms are cached.
+
+    special handling for values that are not standard:
+      isnull - bool
+      in - iterable
+      range - iterable with 2 items
+      year, month, day, week_day, hour, minute - int
+
+    :param terms: (field, operator, value) tuples, operator may be None
+    :type terms: tuple
+    :raises ServiceValidationError: value is not a string
+    """
+    search = list()
+    for field, op, val in terms:
+        if op in LIST_OPERATORS and isinstance(val, (list, tuple)) and val:
+            val = val[0]
+        # query string values, anything else (eg. lists of a json body)
+        # would reach the lookups below
+        if not isinstance(val, str):
+            raise ServiceValidationError('invalid %s' % "__".join(
+                filter(None, [field, op])))
+
+        if op in LIST_OPERATORS:
+            val = REMOVE_RE.sub("", val).split(",")
+            val = tuple(filter(None, (v.strip() for v in val)))
+            if op == 'range' and len(val) > 2:
+                continue
+        elif op == 'isnull' or val in BOOLEAN_VALUES:
+            val = True if val == 'true' else False
+        elif op in INT_OPERATORS:
+            try:
+                val = int(val)
+            except ValueError:
+                continue
+
+        search.append(("__".join(filter(None, [field, op])), val))
+    return tuple(search)
 
 
 class ControllerBase():
@@ -52,16 +125,21 @@ class ControllerBase():
         validation_order = list()
         allowed_ordering = list()
 
+    operators = OPERATORS
+    # accepted search parameters, compiled once per controller class
+    search_spec = compile_search_fields(Meta.search_fields)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.search_spec = compile_search_fields(
+            getattr(cls.Meta, 'search_fields', dict()))
+
     def __init__(self, request=None, instance=None, data=None, partial=False):
         """Initializes new object.
 
         :param request: Django wsgi request instance
         :type request: Request
         """
-        self.operators = ['in', 'isnull', 'icontains', 'istartswith',
-                          'iendswith', 'iexact', 'gt', 'lt', 'gte', 'lte',
-                          'range', 'year', 'month', 'day', 'week_day',
-                          'hour', 'minute']
         self.request = request
         self.user = request.user
         self.cleaned_data = dict()
@@ -103,6 +181,43 @@ class ControllerBase():
             limit = self._meta.default_list_limit
         self.cleaned_data['limit'] = limit
 
+    def validate_cursor(self, cursor):
+        """Decodes an opaque keyset cursor made by encode_cursor for the
+        same order. Cursor mode is on when the parameter is sent, an empty
+        value asks for the first page.
+
+        :param cursor: nextCursor of the previous page
+        :type cursor: str
+        """
+        if cursor is None:
+            self.cleaned_data['cursor'] = None
+            return
+        if not cursor:
+            self.cleaned_data['cursor'] = []
+            return
+        try:
+            data = json.loads(base64.urlsafe_b64decode(
+                cursor.encode('ascii') + b'=' * (-len(cursor) % 4))
+                .decode('utf-8'))
+        except (ValueError, TypeError, binascii.Error):
+            raise ServiceValidationError('invalid cursor')
+        if not isinstance(data, dict) or not isinstance(data.get('key'), list)\
+                or data.get('order') != self.cleaned_data.get('order'):
+            raise ServiceValidationError('invalid cursor')
+        self.cleaned_data['cursor'] = data['key']
+
+    def encode_cursor(self, key):
+        """Opaque cursor resuming after key, the last (order key,
+        primary key) values of a page.
+
+        :param key: json serializable values
+        :type key: list
+        """
+        data = json.dumps({'order': self.cleaned_data.get('order'),
+                           'key': list(key)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode('utf-8'))\
+            .decode('ascii').rstrip('=')
+
     def validate_order(self, order, replaceable=None):
         if not order:
             self.cleaned_data['order'] = self._meta.allowed_ordering[0]
@@ -127,88 +242,42 @@ class ControllerBase():
         :param args: list of arguments (ignored)
         :type args: list
         """
-        search = dict()
+        self.cleaned_data['search'] = self.parse_search_params()
 
-        for q, val in self.data.items():
-            # check that q is one of the allowed search values and if it
-            # contains and operator split it into field and operator
-            q = q.split("__")
-            op = None
-            if len(q) > 1 and q[-1] in self.operators:
-                op = q[-1]
-                q = q[:-1]
-            q = "__".join(q)
-            allowed_ops = self._meta.search_fields.get(q, None)
-            if allowed_ops is None or (allowed_ops is () and op) or \
-                    (op and op not in allowed_ops):
-                continue
-
-            # special handling for values that are not standard:
-            #   isnull - bool
-            #   in - iterable
-            #   range - iterable with 2 items
-            #   year, month, day, week_day, hour, minute - int
-            if op in ['in', 'range']:
-                if isinstance(val, list):
-                    val = val[0]
-
-                val = re.sub(REMOVE_PATTERN, "", val).split(",")
-                val = filter(None, (v.strip() for v in val))
-                if op == 'range' and len(list(val)) > 2:
-                    continue
-            elif op == 'isnull' or val in ['true', 'false']:
-                val = True if val == 'true' else False
-            elif op in ['year', 'month', 'day', 'week_day', 'hour', 'minute']:
-                try:
-                    val = int(val)
-                except ValueError:
-                    continue
+    def validate_exclude(self, *args):
+        """Same as validate_search for the parameters prefixed by
+        'exclude__', populates self.cleaned_data['exclude'].
 
-            search["__".join(filter(None, [q, op]))] = val
-        self.cleaned_data['search'] = search
+        :param args: list of arguments (ignored)
+        :type args: list
+        """
+        self.cleaned_data['exclude'] = self.parse_search_params('exclude__')
 
-    def validate_exclude(self, *args):
-        pre_exclude = ((k.replace('exclude__', ''), v)
-                       for k, v in self.data.items()
-                       if k.startswith('exclude__'))
-        exclude = dict()
-        for q, val in pre_exclude:
-            # check that q is one of the allowed search values and if it
-            # contains and operator split it into field and operator
-            q = q.split("__")
-            op = None
-            if q[-1] in self.operators:
-                op = q[-1]
-                q = q[:-1]
-            q = "__".join(q)
-            allowed_ops = self._meta.search_fields.get(q, None)
-            if allowed_ops is None or (allowed_ops is () and op) or \
-                    (op and op not in allowed_ops):
-                continue
+    def parse_search_params(self, prefix=''):
+        """Shared parser of validate_search and validate_exclude, returns
+        the queryset kwargs of the allowed search parameters in self.data
+        starting with prefix.
 
-            # special handling for values that are not standard:
-            #   isnull - bool
-            #   in - iterable
-            #   range - iterable with 2 items
-            #   year, month, day, week_day, hour, minute - int
-            if op in ['in', 'range']:
-                if isinstance(val, list):
-                    val = val[0]
-
-                val = re.sub(REMOVE_PATTERN, "", val).split(",")
-                val = filter(None, (v.strip() for v in val))
-                if op == 'range' and len(list(val)) > 2:
-                    continue
-            elif op == 'isnull' or val in ['true', 'false']:
-                val = True if val == 'true' else False
-            elif op in ['year', 'month', 'day', 'week_day', 'hour', 'minute']:
-                try:
-                    val = int(val)
-                except ValueError:
+        :param prefix: parameter prefix
+        :type prefix: str
+        """
+        spec = self.search_spec
+        terms = list()
+        for q, val in self.data.items():
+            if prefix:
+                if not q.startswith(prefix):
                     continue
-
-            exclude["__".join(filter(None, [q, op]))] = val
-        self.cleaned_data['exclude'] = exclude
+                q = q[len(prefix):]
+            # check that q is one of the allowed search values, it gives
+            # back the field and operator
+            term = spec.get(q)
+            if term is not None:
+                terms.append((term[0], term[1], val))
+        terms = tuple(terms)
+        try:
+            return dict(parse_search(terms))
+        except TypeError:  # unhashable value, eg. a list in plain dict data
+            return dict(parse_search.__wrapped__(terms))
 
     def is_valid(self):
         for field in self._meta.validation_order:
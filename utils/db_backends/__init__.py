@@ -0,0 +1,3 @@
+"""Database backends taking their connections from utils.db_pool, select
+them with ENGINE 'utils.db_backends.<vendor>'.
+"""
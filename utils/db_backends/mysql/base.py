@@ -0,0 +1,8 @@
+# libs
+from django.db.backends.mysql import base
+# local
+from utils.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,8 @@
+# libs
+from django.db.backends.sqlite3 import base
+# local
+from utils.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
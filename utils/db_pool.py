@@ -0,0 +1,219 @@
+# python
+from __future__ import unicode_literals
+from collections import deque
+import threading
+import time
+# libs
+from django.conf import settings
+from django.db import connections
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the pool TIMEOUT."""
+
+
+class ConnectionPool(object):
+    """Thread safe pool of raw DB-API connections of one database alias.
+
+    At most `size` connections are open, callers wait up to `timeout`
+    seconds for one to be released. Connections older than `recycle`
+    seconds or idle for more than `idle_timeout` seconds are closed instead
+    of being reused, before the server drops them (MySQL wait_timeout).
+    """
+
+    def __init__(self, size=10, recycle=3600, idle_timeout=300, timeout=10):
+        self.size = size
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        # (connection, opened, released), most recently released last
+        self._idle = deque()
+        self._opened = dict()
+        self.in_use = 0
+        self.opened = 0
+        self.closed = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+
+    def _expired(self, opened, released, now):
+        return now - opened >= self.recycle or \
+            now - released >= self.idle_timeout
+
+    def _discard(self, connection):
+        self._opened.pop(id(connection), None)
+        self.closed += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self, connect):
+        """Returns an idle connection, or a new one made by connect()."""
+        started = None
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    connection, opened, released = self._idle.pop()
+                    if self._expired(opened, released, now):
+                        self._discard(connection)
+                        continue
+                    self.in_use += 1
+                    return connection
+                if self.in_use < self.size:
+                    self.in_use += 1
+                    break
+                if started is None:
+                    started = now
+                    self.waits += 1
+                remaining = self.timeout - (now - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout('no connection available after %ss' %
+                                      self.timeout)
+                self._cond.wait(remaining)
+                self.wait_time += time.monotonic() - now
+
+        try:
+            connection = connect()
+        except Exception:
+            with self._cond:
+                self.in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opened[id(connection)] = time.monotonic()
+            self.opened += 1
+        return connection
+
+    def release(self, connection, reusable=True):
+        """Gives back an acquired connection, closed when not reusable."""
+        with self._cond:
+            self.in_use -= 1
+            opened = self._opened.get(id(connection), 0)
+            now = time.monotonic()
+            if reusable and not self._expired(opened, now, now):
+                self._idle.append((connection, opened, now))
+            else:
+                self._discard(connection)
+            self._cond.notify()
+
+    def close_idle(self):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.popleft()[0])
+
+    def stats(self):
+        with self._cond:
+            return {'size': self.size,
+                    'inUse': self.in_use,
+                    'idle': len(self._idle),
+                    'opened': self.opened,
+                    'closed': self.closed,
+                    'waits': self.waits,
+                    'waitTimeMs': round(self.wait_time * 1000, 3),
+                    'timeouts': self.timeouts}
+
+
+_pools = dict()
+_pools_lock = threading.Lock()
+_health = {'checks': 0, 'failures': 0}
+
+
+def get_pool(alias, settings_dict):
+    """Process wide ConnectionPool of alias, configured by the POOL dict of
+    its DATABASES entry (SIZE, RECYCLE, IDLE_TIMEOUT, TIMEOUT).
+    """
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                options = settings_dict.get('POOL') or dict()
+                pool = _pools[alias] = ConnectionPool(**dict(
+                    (key.lower(), value) for key, value in options.items()))
+    return pool
+
+
+def pool_stats():
+    """Pool metrics per pooled alias and the persistent connection health
+    check counters.
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {'pools': dict((alias, pool.stats())
+                          for alias, pool in pools.items()),
+            'healthChecks': dict(_health)}
+
+
+class PooledDatabaseWrapperMixin(object):
+    """DatabaseWrapper mixin taking the connections from the alias
+    ConnectionPool, closing the wrapper hands the connection back. Use it
+    with CONN_MAX_AGE = 0 so that every request gives its connection back.
+    """
+
+    def get_new_connection(self, conn_params):
+        connect = super(PooledDatabaseWrapperMixin, self).get_new_connection
+        return get_pool(self.alias, self.settings_dict).acquire(
+            lambda: connect(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        reusable = not self.in_atomic_block and \
+            (not self.errors_occurred or self.is_usable())
+        if reusable and not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except Exception:
+                reusable = False
+        get_pool(self.alias, self.settings_dict).release(self.connection,
+                                                          reusable)
+
+
+def check_connections():
+    """Pings the persistent connections of the current thread idle for
+    settings.DB_HEALTH_CHECK_AFTER seconds, and closes the dead ones so the
+    next query reconnects instead of failing.
+    """
+    after = getattr(settings, 'DB_HEALTH_CHECK_AFTER', 30)
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or \
+                now - getattr(connection, 'last_used', 0) < after:
+            continue
+        _health['checks'] += 1
+        if not connection.is_usable():
+            _health['failures'] += 1
+            connection.close()
+
+
+def release_connections():
+    """Applies CONN_MAX_AGE to the connections of the current thread,
+    handing pooled connections back.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
+        connection.close_if_unusable_or_obsolete()
+
+
+class ConnectionHealthMiddleware(object):
+    """Checks the persistent connections before the request and applies
+    CONN_MAX_AGE right after it, in the thread that ran the view. Under
+    ASGI Django sends request_started/finished from other threads, so
+    their connection handling never reaches the view connections.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        check_connections()
+        try:
+            return self.get_response(request)
+        finally:
+            release_connections()
@@ -0,0 +1,94 @@
+# python
+from __future__ import unicode_literals
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from math import radians, degrees, cos, sin, asin, sqrt
+# libs
+import numpy as np
+from django.db.models import Q
+
+
+# Radius of earth in kilometers is 6371
+EARTH_RADIUS_KM = 6371
+KM_TO_MILES = 0.62137
+EARTH_RADIUS_MILES = EARTH_RADIUS_KM * KM_TO_MILES
+
+COORDINATE_PLACES = Decimal('0.000001')
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance in miles between two points given in decimal
+    degrees.
+    """
+    # convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return EARTH_RADIUS_KM * c * KM_TO_MILES
+
+
+def haversine_many(latitude, longitude, latitudes, longitudes):
+    """Vectorized haversine, distances in miles between one point and the
+    arrays of points given in decimal degrees. Same formula and operation
+    order as haversine(), numpy's trigonometric functions can still differ
+    from math's in the last bit so both agree on the formatted distance
+    ('%0.1f Miles'), not always on the float.
+    """
+    lon1, lat1 = radians(longitude), radians(latitude)
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat/2)**2 + cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    return EARTH_RADIUS_KM * c * KM_TO_MILES
+
+
+def bounding_box(latitude, longitude, radius):
+    """Returns (min_lat, max_lat, min_lon, max_lon) of the box enclosing the
+    circle of `radius` miles around the given point. Longitude bounds are
+    None when the circle covers a pole, min_lon > max_lon when the box
+    crosses the antimeridian.
+    """
+    dlat = degrees(radius / EARTH_RADIUS_MILES)
+    min_lat, max_lat = latitude - dlat, latitude + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    dlon = degrees(asin(min(1.0, sin(radius / EARTH_RADIUS_MILES) /
+                                 cos(radians(latitude)))))
+    min_lon, max_lon = longitude - dlon, longitude + dlon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def bounding_box_q(latitude, longitude, radius, lat_field='latitude',
+                   lon_field='longitude'):
+    """Range filter on the given latitude/longitude columns matching every
+    point of the circle of `radius` miles, so the database can use an index
+    to discard far away rows before any exact distance is computed.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude,
+                                                      radius)
+    q = Q(**{'%s__range' % lat_field: (_floor(min_lat), _ceil(max_lat))})
+    if min_lon is None:
+        return q
+    if min_lon <= max_lon:
+        return q & Q(**{'%s__range' % lon_field: (_floor(min_lon),
+                                                  _ceil(max_lon))})
+    # crosses the antimeridian
+    return q & (Q(**{'%s__gte' % lon_field: _floor(min_lon)}) |
+                Q(**{'%s__lte' % lon_field: _ceil(max_lon)}))
+
+
+def _floor(value):
+    return Decimal(repr(value)).quantize(COORDINATE_PLACES, ROUND_FLOOR)
+
+
+def _ceil(value):
+    return Decimal(repr(value)).quantize(COORDINATE_PLACES, ROUND_CEILING)
@@ -0,0 +1,120 @@
+# python
+from __future__ import unicode_literals
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import random
+import threading
+import time
+# libs
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics(object):
+    """Query count and timings (seconds) of a sampled request. Also the
+    execute_wrapper counting the queries of the request connections.
+    """
+
+    def __init__(self):
+        # pool threads of utils.concurrency add to the same metrics
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.timings = OrderedDict((name, 0.0) for name in
+                                   ('db', 'serializer', 'geo'))
+
+    def add(self, name, seconds, queries=0):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+            self.queries += queries
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - start, 1)
+
+    def server_timing(self):
+        metrics = list()
+        for name, seconds in self.timings.items():
+            metric = '%s;dur=%.2f' % (name, seconds * 1000)
+            if name == 'db':
+                metric += ';desc="%d queries"' % self.queries
+            metrics.append(metric)
+        return ', '.join(metrics)
+
+
+@contextmanager
+def timed(name):
+    """Adds the time spent in the block to the `name` timing of the current
+    request, a no-op when the request isn't sampled.
+    """
+    metrics = _metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+@contextmanager
+def record_queries():
+    """Counts the queries of the current thread connections in the current
+    request metrics, a no-op when the request isn't sampled.
+    """
+    metrics = _metrics.get()
+    if metrics is None:
+        yield
+        return
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+class InstrumentationMiddleware(object):
+    """Records the SQL query count and time, the serializer time and the
+    geo computations time of a sample of the requests, see
+    settings.INSTRUMENTATION_SAMPLE_RATE. They are sent back in the
+    Server-Timing header and logged as a json line.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with record_queries():
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        metrics.add('total', time.perf_counter() - start)
+
+        response['Server-Timing'] = metrics.server_timing()
+        record = OrderedDict((
+            ('method', request.method),
+            ('path', request.path),
+            ('status', response.status_code),
+            ('queries', metrics.queries)))
+        for name, seconds in metrics.timings.items():
+            record['%s_ms' % name] = round(seconds * 1000, 2)
+        logger.info(json.dumps(record))
+        return response
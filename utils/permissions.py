@@ -0,0 +1,18 @@
+# python
+from __future__ import unicode_literals
+# libs
+from rest_framework.permissions import BasePermission
+
+
+class IsUserOrStaff(BasePermission):
+    """Only the authenticated user whose id is the user_id url argument of
+    the view, or staff, are allowed.
+    """
+    message = 'You can only access your own restaurant lists.'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return user.is_staff or \
+            str(user.pk) == str(view.kwargs.get('user_id'))
@@ -0,0 +1,133 @@
+# python
+from __future__ import unicode_literals
+from contextlib import contextmanager
+from contextvars import ContextVar
+import random
+import threading
+import time
+# libs
+from django.conf import settings
+from django.core.cache import caches
+from django.db import OperationalError
+
+
+STICKY_KEY = 'db:sticky:%s'
+# MySQL client / server errors meaning the replica can't be reached:
+# can't connect (2002, 2003), unknown host (2005), gone away (2006), lost
+# connection (2013, 2055), too many connections (1040), shutting down
+# (1053)
+CONNECTION_ERRORS = frozenset([1040, 1053, 2002, 2003, 2005, 2006, 2013,
+                               2055])
+
+_replica = ContextVar('replica_alias', default=None)
+_unhealthy = dict()
+_unhealthy_lock = threading.Lock()
+
+
+class ReplicaUnavailable(Exception):
+    """A replica failed during replica_reads, it is skipped from now on
+    and the work can be retried on the primary.
+    """
+
+
+def mark_unhealthy(alias, seconds=None):
+    """Skips the replica alias for settings.DATABASE_REPLICA_RETRY seconds.
+    """
+    if seconds is None:
+        seconds = getattr(settings, 'DATABASE_REPLICA_RETRY', 30)
+    with _unhealthy_lock:
+        _unhealthy[alias] = time.monotonic() + seconds
+
+
+def mark_healthy(alias):
+    with _unhealthy_lock:
+        _unhealthy.pop(alias, None)
+
+
+def healthy_replicas():
+    now = time.monotonic()
+    with _unhealthy_lock:
+        for alias, until in list(_unhealthy.items()):
+            if until <= now:
+                del _unhealthy[alias]
+        return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', ())
+                if alias not in _unhealthy]
+
+
+def sticky_cache():
+    """The settings.DATABASE_REPLICA_STICKY_CACHE cache alias, shared by
+    the workers so that the next request of key sees the marker whichever
+    worker serves it.
+    """
+    return caches[getattr(settings, 'DATABASE_REPLICA_STICKY_CACHE',
+                          'default')]
+
+
+def stick_to_primary(key):
+    """Sends the replica_reads of key (eg. a user) to the primary for
+    settings.DATABASE_REPLICA_STICKY seconds, longer than the replication
+    lag, so that they see their own writes.
+    """
+    seconds = getattr(settings, 'DATABASE_REPLICA_STICKY', 10)
+    if getattr(settings, 'DATABASE_REPLICAS', ()) and seconds:
+        sticky_cache().set(STICKY_KEY % key, True, seconds)
+
+
+def connection_error(error):
+    """Whether the OperationalError error is a lost or refused connection
+    (CONNECTION_ERRORS) rather than an error of the query.
+    """
+    return bool(error.args) and error.args[0] in CONNECTION_ERRORS
+
+
+@contextmanager
+def replica_reads(sticky_key=None):
+    """Routes the reads of settings.DATABASE_REPLICA_MODELS made in the
+    block to one healthy replica, picked at random for the whole block.
+    The primary is used when no replica is healthy or sticky_key wrote
+    recently, see stick_to_primary. A replica failing with a connection
+    error is marked unhealthy and ReplicaUnavailable is raised, the other
+    errors are raised as they are.
+    """
+    replicas = healthy_replicas()
+    if not replicas or (sticky_key is not None and
+                        sticky_cache().get(STICKY_KEY % sticky_key)):
+        yield None
+        return
+    alias = random.choice(replicas)
+    token = _replica.set(alias)
+    try:
+        yield alias
+    except OperationalError as e:
+        if not connection_error(e):
+            raise
+        mark_unhealthy(alias)
+        raise ReplicaUnavailable(alias, e)
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter(object):
+    """Database router sending the reads made inside replica_reads to the
+    replica picked for the block, everything else goes to default.
+    Replicas are copies of default, they are never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is not None and model._meta.label in getattr(
+                settings, 'DATABASE_REPLICA_MODELS', ()):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same data on every alias
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', ()):
+            return False
+        return None
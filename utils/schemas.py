@@ -0,0 +1,74 @@
+# python
+from __future__ import unicode_literals
+import hashlib
+import os
+import threading
+import time
+# libs
+from django.conf import settings
+
+
+class LazySchema(object):
+    """APIView.schema descriptor building the schema with factory on first
+    access, so that the schema machinery (coreapi, coreschema) is only
+    imported by the schema generation and not when the view is loaded.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.schema = None
+
+    def __get__(self, instance, owner):
+        if self.schema is None:
+            self.schema = self.factory()
+        return self.schema.__get__(instance, owner)
+
+
+def generate_schema():
+    """Swagger 2.0 (OpenAPI) JSON document of the API introspected from the
+    urlconf, what rest_framework_swagger renders. Needs coreapi and
+    django-rest-swagger installed.
+
+    :rtype: bytes
+    """
+    from rest_framework.schemas.coreapi import SchemaGenerator
+    from rest_framework_swagger.renderers import (OpenAPICodec,
+                                                  OpenAPIRenderer)
+
+    document = SchemaGenerator(title=getattr(
+        settings, 'API_SCHEMA_TITLE', None)).get_schema(public=True)
+    return OpenAPICodec().encode(document,
+                                 **OpenAPIRenderer().get_customizations())
+
+
+_schema = None
+_schema_lock = threading.Lock()
+
+
+def api_schema():
+    """(content, etag, last modified timestamp) of the API document, read
+    once per process from settings.API_SCHEMA_FILE (written by
+    `manage.py generate_api_schema` at deploy) or, without the file,
+    generated on the first call.
+    """
+    global _schema
+    if _schema is None:
+        with _schema_lock:
+            if _schema is None:
+                path = getattr(settings, 'API_SCHEMA_FILE', None)
+                if path and os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                    modified = os.path.getmtime(path)
+                else:
+                    content, modified = generate_schema(), time.time()
+                _schema = (content,
+                           '"%s"' % hashlib.sha1(content).hexdigest(),
+                           int(modified))
+    return _schema
+
+
+def reset_api_schema():
+    global _schema
+    with _schema_lock:
+        _schema = None
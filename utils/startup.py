@@ -0,0 +1,45 @@
+# python
+from __future__ import unicode_literals
+import logging
+# libs
+from django.apps import apps
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+# local
+from .schemas import api_schema
+
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm():
+    """Does at startup the work the first requests of a worker would
+    otherwise pay for: the model _meta field caches, importing the urlconf
+    and every view module, populating the URL resolver, loading the REST
+    framework classes named in settings and the API document. Without
+    API_SCHEMA_FILE nor the packages generating it, the document is
+    skipped and the root URL answers 503.
+    """
+    for model in apps.get_models(include_auto_created=True):
+        meta = model._meta
+        meta.get_fields()
+        meta.concrete_fields
+        meta.local_concrete_fields
+        meta.related_objects
+
+    resolver = get_resolver()
+    # reverse_dict populates the nested resolvers too
+    resolver.reverse_dict
+
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES',
+                 'DEFAULT_AUTHENTICATION_CLASSES',
+                 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_THROTTLE_CLASSES',
+                 'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+                 'DEFAULT_METADATA_CLASS', 'EXCEPTION_HANDLER'):
+        getattr(api_settings, name)
+
+    try:
+        api_schema()
+    except ImportError as e:
+        logger.warning('API document not loaded, run `manage.py '
+                       'generate_api_schema`: %s', e)
@@ -0,0 +1,80 @@
+# python
+from __future__ import unicode_literals
+# libs
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Rate throttle keeping two counters per client instead of the history
+    of its request timestamps: the requests of the current fixed window
+    and of the previous one, weighted by how much of it still overlaps the
+    sliding window. One atomic incr and one get per request, whatever the
+    rate.
+
+    The counters live in the settings.THROTTLE_CACHE cache alias, a cache
+    shared by the workers (memcached, redis, a file based cache) makes the
+    limit global instead of per process.
+    """
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, self.elapsed = divmod(self.now, self.duration)
+        current = '%s:%d' % (self.key, window)
+        # counted first so that concurrent requests see each other
+        try:
+            self.current = self.cache.incr(current)
+        except ValueError:
+            if self.cache.add(current, 1, self.duration * 2):
+                self.current = 1
+            else:
+                self.current = self.cache.incr(current)
+        self.previous = self.cache.get('%s:%d' % (self.key, window - 1), 0)
+
+        overlap = 1 - self.elapsed / float(self.duration)
+        if self.previous * overlap + self.current > self.num_requests:
+            # rejected requests don't count
+            self.cache.decr(current)
+            self.current -= 1
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """Seconds until the next request is accepted."""
+        remaining = self.num_requests - self.current
+        if remaining > 0:
+            # the share of the previous window has to drop
+            return max(0.0, self.duration * (
+                1 - (remaining - 1) / float(self.previous)) - self.elapsed)
+        # next window, the current one becomes the previous
+        return self.duration - self.elapsed + max(0.0, self.duration * (
+            1 - (self.num_requests - 1) / float(self.current)))
+
+
+class UserSlidingWindowThrottle(SlidingWindowRateThrottle):
+    """UserRateThrottle counterpart: per user, or per IP address for the
+    anonymous requests. Uses the 'user' rate.
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}